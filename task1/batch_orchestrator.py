@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MAX_ACTIVE_BATCHES = 10
+UPLOAD_WORKERS = 4
+MIN_POLL_SECONDS = 10.0
+MAX_POLL_SECONDS = 300.0
+POLL_BACKOFF_FACTOR = 1.5
+MAX_RESUBMITS = 1
+
+FAILED_STATUSES = {"failed", "expired", "cancelled"}
+FINISHED_STATUSES = {"done", "gave_up"}
+
+logger = logging.getLogger(__name__)
+
+
+class BatchOrchestrator:
+    def __init__(
+        self,
+        runner,
+        state_path: str,
+        max_active_batches: int = MAX_ACTIVE_BATCHES,
+        max_enqueued_tokens: Optional[int] = None,
+        chunk_tokens: Optional[Dict[str, int]] = None
+    ):
+        self.runner = runner
+        self.state_path = Path(state_path)
+        self.max_active_batches = max_active_batches
+        self.max_enqueued_tokens = max_enqueued_tokens
+        self.chunk_tokens = chunk_tokens or {}
+        self.state: Dict[str, dict] = self.load_state()
+
+    def load_state(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, encoding="utf-8") as file:
+            state = json.load(file)
+        logger.info(f"Zustand mit {len(state)} Chunks aus {self.state_path} geladen.")
+        return state
+
+    def save_state(self) -> None:
+        # Erst in eine temporäre Datei schreiben, damit ein Absturz den Zustand nicht zerstört
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def run(self, chunk_paths: List[str]) -> Dict[str, List[str]]:
+        for chunk_path in chunk_paths:
+            self._init_chunk(chunk_path)
+        self.save_state()
+
+        poll_interval = MIN_POLL_SECONDS
+        while True:
+            changed = self._submit_pending(chunk_paths)
+            changed = self._poll_active(chunk_paths) or changed
+            self.save_state()
+
+            open_chunks = [path for path in chunk_paths if self.state[path]["status"] not in FINISHED_STATUSES]
+            if not open_chunks:
+                break
+            # Adaptive Wartezeit: kurz nach Änderungen, sonst schrittweise länger
+            poll_interval = MIN_POLL_SECONDS if changed else min(MAX_POLL_SECONDS, poll_interval * POLL_BACKOFF_FACTOR)
+            logger.info(f"{len(open_chunks)} Chunks offen, nächste Abfrage in {poll_interval:.0f}s.")
+            time.sleep(poll_interval)
+
+        return {path: self._read_results(path) for path in chunk_paths}
+
+    def _init_chunk(self, chunk_path: str) -> None:
+        with open(chunk_path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+        entry = self.state.get(chunk_path)
+        # Nur wiederaufnehmen, wenn der Inhalt der Chunk-Datei unverändert ist
+        if entry is None or entry.get("sha256") != digest:
+            self.state[chunk_path] = {
+                "sha256": digest,
+                "status": "pending",
+                "file_id": None,
+                "batch_id": None,
+                "result_path": None,
+                "submissions": 0,
+                "submit_failures": 0,
+                "download_failures": 0,
+                "retry_at": 0.0
+            }
+        elif entry["status"] == "gave_up" and not entry["result_path"]:
+            # Fehlgeschlagene Chunks ohne Ergebnisse werden bei einem neuen Lauf erneut versucht
+            entry.update({"status": "pending", "batch_id": None, "submissions": 0, "submit_failures": 0, "download_failures": 0, "retry_at": 0.0})
+
+    def _active_chunks(self, chunk_paths: List[str]) -> List[str]:
+        return [
+            path for path in chunk_paths
+            if self.state[path]["batch_id"] and self.state[path]["status"] not in FINISHED_STATUSES
+        ]
+
+    def _submit_pending(self, chunk_paths: List[str]) -> bool:
+        active = self._active_chunks(chunk_paths)
+        enqueued_tokens = sum(self.chunk_tokens.get(path, 0) for path in active)
+        to_submit = []
+        now = time.time()
+        for path in chunk_paths:
+            # Nach einem Fehler beim Einreichen erst nach Ablauf der Wartezeit erneut versuchen
+            if self.state[path]["status"] != "pending" or self.state[path].get("retry_at", 0.0) > now:
+                continue
+            if len(active) + len(to_submit) >= self.max_active_batches:
+                break
+            tokens = self.chunk_tokens.get(path, 0)
+            if self.max_enqueued_tokens and enqueued_tokens + tokens > self.max_enqueued_tokens and (active or to_submit):
+                break
+            enqueued_tokens += tokens
+            to_submit.append(path)
+
+        if not to_submit:
+            return False
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            submitted = list(executor.map(self._submit_chunk, to_submit))
+        return any(submitted)
+
+    def _submit_chunk(self, chunk_path: str) -> bool:
+        entry = self.state[chunk_path]
+        try:
+            if not entry["file_id"]:
+                entry["file_id"] = self.runner.upload_batch_file(chunk_path).id
+            batch_job = self.runner.start_batch(entry["file_id"])
+        except Exception as e:
+            failures = entry["submit_failures"] = entry.get("submit_failures", 0) + 1
+            if failures > MAX_RESUBMITS:
+                logger.error(f"Fehler beim Starten von {chunk_path}, gebe nach {failures} Versuchen auf: {e}")
+                entry["status"] = "gave_up"
+            else:
+                delay = min(MAX_POLL_SECONDS, MIN_POLL_SECONDS * POLL_BACKOFF_FACTOR ** failures)
+                logger.error(f"Fehler beim Starten von {chunk_path}, neuer Versuch in {delay:.0f}s: {e}")
+                entry["retry_at"] = time.time() + delay
+            return False
+        entry["batch_id"] = batch_job.id
+        entry["status"] = batch_job.status
+        entry["submissions"] += 1
+        return True
+
+    def _poll_active(self, chunk_paths: List[str]) -> bool:
+        active = self._active_chunks(chunk_paths)
+        if not active:
+            return False
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            changes = list(executor.map(self._poll_chunk, active))
+        return any(changes)
+
+    def _poll_chunk(self, chunk_path: str) -> bool:
+        entry = self.state[chunk_path]
+        try:
+            batch_job = self.runner.client.batches.retrieve(entry["batch_id"])
+        except Exception as e:
+            logger.warning(f"Status von {entry['batch_id']} konnte nicht abgefragt werden: {e}")
+            return False
+        if batch_job.status == entry["status"]:
+            return False
+
+        logger.info(f"Batch {entry['batch_id']} ({chunk_path}): {entry['status']} -> {batch_job.status}")
+        if batch_job.status == "completed" or batch_job.status in FAILED_STATUSES:
+            # Abgelaufene Batches liefern teilweise Ergebnisse, diese werden trotzdem übernommen
+            if not self._try_store_results(chunk_path, batch_job.output_file_id):
+                # Status nicht übernehmen, damit die nächste Abfrage den Download wiederholt
+                return True
+            self.runner.record_batch_metrics(batch_job)
+        entry["status"] = batch_job.status
+        if batch_job.status == "completed":
+            # Ohne heruntergeladene Ergebnisse gilt der Chunk als aufgegeben und wird beim nächsten Lauf wiederholt
+            entry["status"] = "done" if entry["result_path"] or not batch_job.output_file_id else "gave_up"
+        elif batch_job.status in FAILED_STATUSES:
+            logger.error(f"Batch {entry['batch_id']} beendet mit Status {batch_job.status}: {batch_job.errors}")
+            if entry["submissions"] <= MAX_RESUBMITS and not batch_job.output_file_id:
+                logger.info(f"{chunk_path} wird erneut eingereicht.")
+                entry["status"] = "pending"
+                entry["batch_id"] = None
+            else:
+                entry["status"] = "gave_up"
+        return True
+
+    def _try_store_results(self, chunk_path: str, output_file_id: Optional[str]) -> bool:
+        # Ein Fehler beim Download darf den Lauf der übrigen Chunks nicht abbrechen
+        entry = self.state[chunk_path]
+        try:
+            self._store_results(chunk_path, output_file_id)
+            return True
+        except Exception as e:
+            failures = entry["download_failures"] = entry.get("download_failures", 0) + 1
+            if failures > MAX_RESUBMITS:
+                logger.error(f"Ergebnisse von {chunk_path} nach {failures} Versuchen nicht geladen, gebe auf: {e}")
+                return True
+            logger.error(f"Ergebnisse von {chunk_path} konnten nicht geladen werden, neuer Versuch bei der nächsten Abfrage: {e}")
+            return False
+
+    def _store_results(self, chunk_path: str, output_file_id: Optional[str]) -> None:
+        if not output_file_id:
+            return
+        lines = self.runner.download_file_lines(output_file_id)
+        result_path = self.state_path.parent / f"{Path(chunk_path).stem}_{self.state[chunk_path]['batch_id']}_output.jsonl"
+        with open(result_path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        self.state[chunk_path]["result_path"] = str(result_path)
+
+    def _read_results(self, chunk_path: str) -> List[str]:
+        result_path = self.state[chunk_path]["result_path"]
+        if not result_path:
+            return []
+        with open(result_path, encoding="utf-8") as file:
+            return [line for line in file.read().split("\n") if line]
@@ -0,0 +1,209 @@
+import os
+import sys
+import csv
+import json
+import asyncio
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+from mock_openai_server import MockConfig, MockOpenAIServer
+
+TASK_DIR = Path(__file__).resolve().parent
+CLASSIFIERS = {
+    "seriell": "review_classifier_seriell.py",
+    "batch": "review_classifier_batch.py",
+    "chunk_batches": "review_classifier_chunk_batches.py",
+    "nltk": "review_classifier_nltk.py",
+}
+# Die Skripte lesen feste Dateinamen aus dem Arbeitsverzeichnis
+INPUT_NAMES = ("task_1_google_maps_comments.csv", "test.csv")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_CONCURRENCY_LEVELS = [1, 5, 10, 20, 50, 100]
+
+REVIEW_SENTENCES = [
+    "Das Essen war hervorragend und sehr frisch.",
+    "Die Bedienung war leider unfreundlich und langsam.",
+    "Schönes Ambiente, die Musik war etwas zu laut.",
+    "Der Kellner hat uns super beraten.",
+    "Wir kommen gerne wieder!",
+    "Das Menu ist klein, aber jedes Gericht ist lecker.",
+    "Preis-Leistung stimmt nicht.",
+    "Sehr gut!",
+    "Top",
+]
+
+
+def generate_corpus(path: Path, n_rows: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["author", "date", "stars", "review"])
+        for index in range(n_rows):
+            review = " ".join(rng.choices(REVIEW_SENTENCES, k=rng.randint(1, 6)))
+            writer.writerow([f"user_{index}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.randint(1, 5), review])
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def reset_server(server: MockOpenAIServer) -> None:
+    urllib.request.urlopen(urllib.request.Request(server.base_url.replace("/v1", "/mock/reset"), data=b"")).read()
+
+
+def latency_stats(server: MockOpenAIServer) -> Dict[str, float]:
+    stats = json.loads(urllib.request.urlopen(server.base_url.replace("/v1", "/mock/stats")).read())
+    latencies = stats["latencies"]
+    return {
+        "api_requests": len(latencies),
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "status_counts": stats["status_counts"]
+    }
+
+
+def run_concurrency_sweep(
+    corpus: Path,
+    server: MockOpenAIServer,
+    levels: List[int],
+    packed: bool,
+    requests_per_minute: int,
+    tokens_per_minute: int
+) -> List[Dict[str, float]]:
+    # Den asynchronen Klassifikator direkt im Prozess aufrufen, damit nur CONCURRENCY variiert
+    os.environ.update(OPENAI_API_KEY="mock", OPENAI_BASE_URL=server.base_url)
+    from review_classifier_seriell import ReviewClassifier
+    with open(corpus, newline="", encoding="utf-8") as file:
+        texts = [row["review"] for row in csv.DictReader(file)]
+    results = []
+    for concurrency in levels:
+        analyzer = ReviewClassifier("mock", concurrency, requests_per_minute, tokens_per_minute)
+        classify = analyzer.classify_reviews_packed_async if packed else analyzer.classify_reviews_async
+        reset_server(server)
+        start = time.perf_counter()
+        asyncio.run(classify(texts))
+        elapsed = time.perf_counter() - start
+        results.append({"concurrency": concurrency, "seconds": elapsed, "rows_per_second": len(texts) / elapsed, **latency_stats(server)})
+    return results
+
+
+def run_classifier(name: str, corpus: Path, server: MockOpenAIServer, timeout: float) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as work_dir:
+        for input_name in INPUT_NAMES:
+            os.symlink(corpus, Path(work_dir) / input_name)
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="mock",
+            OPENAI_BASE_URL=server.base_url,
+            PYTHONPATH=os.pathsep.join([str(TASK_DIR), os.environ.get("PYTHONPATH", "")])
+        )
+        reset_server(server)
+
+        # Logausgaben in eine Datei umleiten, eine volle Pipe würde den Prozess blockieren
+        log_path = Path(work_dir) / "classifier.log"
+        log_file = open(log_path, "wb")
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, str(TASK_DIR / CLASSIFIERS[name])],
+            cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=log_file
+        )
+        # wait4 liefert die Ressourcennutzung genau dieses Kindprozesses
+        deadline = start + timeout
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                process.kill()
+                pid, status, usage = os.wait4(process.pid, 0)
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        log_file.close()
+        stderr = log_path.read_text(encoding="utf-8", errors="replace")
+
+    return {
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "seconds": elapsed,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        **latency_stats(server),
+        "stderr_tail": stderr.strip().splitlines()[-1] if stderr.strip() else ""
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durchsatz, Latenz und Speicherbedarf aller Klassifikatoren gegen den Mock-Server messen.")
+    parser.add_argument("--classifiers", nargs="+", choices=list(CLASSIFIERS), default=list(CLASSIFIERS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--batch-latency", type=float, default=2.0)
+    parser.add_argument("--max-enqueued-tokens", type=int, default=90_000)
+    parser.add_argument("--timeout", type=float, default=3600.0, help="Maximale Laufzeit pro Messung in Sekunden")
+    parser.add_argument(
+        "--concurrency", nargs="*", type=int,
+        help="Statt der Skripte den asynchronen Klassifikator mit diesen CONCURRENCY-Stufen messen (ohne Werte: Standardstufen)"
+    )
+    parser.add_argument("--packed", action="store_true", help="Im Concurrency-Sweep gepackte Anfragen senden")
+    parser.add_argument("--client-rpm", type=int, default=None, help="REQUESTS_PER_MINUTE des Klassifikators im Sweep")
+    parser.add_argument("--client-tpm", type=int, default=None, help="TOKENS_PER_MINUTE des Klassifikators im Sweep")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        requests_per_minute=args.rpm,
+        error_rate_429=args.error_rate_429,
+        batch_latency=args.batch_latency,
+        max_enqueued_tokens=args.max_enqueued_tokens
+    )
+    server = MockOpenAIServer(port=0, config=config).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            for size in args.sizes:
+                corpus = Path(corpus_dir) / f"reviews_{size}.csv"
+                generate_corpus(corpus, size)
+                if args.concurrency is not None:
+                    from review_classifier_seriell import REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE
+                    sweep = run_concurrency_sweep(
+                        corpus, server, args.concurrency or DEFAULT_CONCURRENCY_LEVELS, args.packed,
+                        args.client_rpm or REQUESTS_PER_MINUTE, args.client_tpm or TOKENS_PER_MINUTE
+                    )
+                    for measurement in sweep:
+                        measurement.update({"classifier": "seriell_async_packed" if args.packed else "seriell_async", "rows": size})
+                        results.append(measurement)
+                        print(
+                            f"CONCURRENCY {measurement['concurrency']:>4} {size:>9} Zeilen  {measurement['seconds']:9.1f}s  "
+                            f"{measurement['rows_per_second']:9.0f} Zeilen/s  p99 {measurement['latency_p99_ms']:7.1f}ms  "
+                            f"429 {measurement['status_counts'].get('429', 0)}"
+                        )
+                    continue
+                for name in args.classifiers:
+                    measurement = run_classifier(name, corpus, server, args.timeout)
+                    measurement.update({"classifier": name, "rows": size, "rows_per_second": size / measurement["seconds"]})
+                    results.append(measurement)
+                    print(
+                        f"{name:<14} {size:>9} Zeilen  {measurement['seconds']:9.1f}s  "
+                        f"{measurement['rows_per_second']:9.0f} Zeilen/s  p99 {measurement['latency_p99_ms']:7.1f}ms  "
+                        f"RSS {measurement['peak_rss_mb']:8.1f}MB  exit {measurement['exit_code']}"
+                    )
+    finally:
+        server.stop()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Ergebnisse gespeichert in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import time
+import random
+from review_classifier_nltk import BATCH_SIZE, classify_review, classify_reviews_batched
+
+N_REVIEWS = 20_000
+SERIAL_SAMPLE = 2_000
+
+SAMPLE_SENTENCES = [
+    "Das Essen war hervorragend und sehr frisch.",
+    "Die Bedienung war leider unfreundlich und langsam.",
+    "Schönes Ambiente, die Musik war etwas zu laut.",
+    "Der Kellner hat uns super beraten.",
+    "Wir kommen gerne wieder!",
+    "Das Menu ist klein, aber jedes Gericht ist lecker.",
+    "Preis-Leistung stimmt nicht.",
+    "Top",
+]
+
+def generate_reviews(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(SAMPLE_SENTENCES, k=rng.randint(1, 5))) for _ in range(n)]
+
+def measure(label: str, func, reviews: list) -> float:
+    start = time.perf_counter()
+    func(reviews)
+    elapsed = time.perf_counter() - start
+    rate = len(reviews) / elapsed
+    print(f"{label:<28} {len(reviews):>8} Reviews  {elapsed:8.2f}s  {rate:10.0f} Reviews/s")
+    return rate
+
+def main():
+    reviews = generate_reviews(N_REVIEWS)
+    measure("seriell (pro Review)", lambda texts: [classify_review(text) for text in texts], reviews[:SERIAL_SAMPLE])
+
+    cores = os.cpu_count() or 1
+    process_counts = sorted({1, 2, 4, 8, 16, cores})
+    for n_process in [count for count in process_counts if count <= cores]:
+        measure(
+            f"batched n_process={n_process}",
+            lambda texts: classify_reviews_batched(texts, batch_size=BATCH_SIZE, n_process=n_process),
+            reviews
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from classification_cache import normalize_review
+from streaming_io import RATING_COLUMNS, read_output
+
+CHECKPOINT_FILE = "classification_checkpoint.jsonl"
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_review(text).encode("utf-8")).hexdigest()[:16]
+
+
+def default_key_columns(columns: List[str]) -> List[str]:
+    # Ohne explizite ID identifizieren alle übrigen Spalten (z.B. Autor, Datum) ein Review
+    if "review_id" in columns:
+        return ["review_id"]
+    return [column for column in columns if column != "review" and column not in RATING_COLUMNS.values()]
+
+
+def review_keys(df: pd.DataFrame, key_columns: Optional[List[str]] = None) -> List[str]:
+    key_columns = key_columns or default_key_columns(list(df.columns))
+    keys = []
+    seen: Dict[str, int] = {}
+    # Fehlende Werte als leeren Text behandeln, wie beim Einlesen der letzten Ausgabe
+    for values in df[key_columns].astype(object).fillna("").astype(str).itertuples(index=False):
+        key = hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()[:16]
+        # Gleiche Schlüssel werden durchnummeriert, damit jede Zeile eindeutig bleibt
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        keys.append(f"{key}#{occurrence}")
+    return keys
+
+
+def load_previous_results(csv_path: str, key_columns: Optional[List[str]] = None) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    if not os.path.exists(csv_path):
+        return {}
+    previous = read_output(csv_path, dtype=str, keep_default_na=False)
+    # Parquet behält Typen und fehlende Werte; für den Abgleich wie beim CSV-Import als Text behandeln
+    previous = previous.astype(object).fillna("").astype(str)
+    if not set(RATING_COLUMNS.values()) <= set(previous.columns):
+        logger.warning(f"{csv_path} enthält keine Rating-Spalten und wird ignoriert.")
+        return {}
+    keys = review_keys(previous, key_columns)
+    known = {}
+    skipped = 0
+    for key, (_, row) in zip(keys, previous.iterrows()):
+        result = {category: row[column] or "None" for category, column in RATING_COLUMNS.items()}
+        if all(value == "None" for value in result.values()):
+            # In der Ausgabe ist ein Fallback (Fehler) nicht von "nichts erwähnt" zu unterscheiden; solche Zeilen
+            # erneut klassifizieren, echte Ergebnisse kommen dabei ohne API-Aufruf aus dem Klassifizierungs-Cache
+            skipped += 1
+            continue
+        known[key] = (content_hash(str(row["review"])), result)
+    logger.info(f"{len(known)} Ergebnisse aus dem letzten Lauf ({csv_path}) geladen, {skipped} ohne Rating werden erneut geprüft.")
+    return known
+
+
+class CheckpointStore:
+    def __init__(self, path: str = CHECKPOINT_FILE):
+        self.path = path
+
+    def load(self) -> Dict[str, Tuple[str, Dict[str, str]]]:
+        known = {}
+        if not os.path.exists(self.path):
+            return known
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Eine abgebrochene letzte Zeile nach einem Absturz wird übersprungen
+                    continue
+                known[record["key"]] = (record["hash"], record["result"])
+        logger.info(f"{len(known)} Ergebnisse aus dem Checkpoint {self.path} geladen.")
+        return known
+
+    def append(self, records: List[Tuple[str, str, Dict[str, str]]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            for key, hash_value, result in records:
+                file.write(json.dumps({"key": key, "hash": hash_value, "result": result}, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
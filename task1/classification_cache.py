@@ -0,0 +1,131 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+CACHE_FILE = "classification_cache.sqlite"
+MAX_CACHE_ENTRIES = 500_000
+# SQLite erlaubt nur eine begrenzte Anzahl Parameter pro Abfrage
+SQL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_review(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def deduplicate_reviews(texts: List[str]) -> Tuple[List[str], List[int]]:
+    # Liefert die eindeutigen Texte und pro Zeile den Index in diese Liste
+    positions: Dict[str, int] = {}
+    unique_texts = []
+    inverse = []
+    for text in texts:
+        normalized = normalize_review(text)
+        if normalized not in positions:
+            positions[normalized] = len(unique_texts)
+            unique_texts.append(text)
+        inverse.append(positions[normalized])
+    return unique_texts, inverse
+
+
+class ClassificationCache:
+    def __init__(self, path: str, prompt_template: str, model: str, max_entries: int = MAX_CACHE_ENTRIES):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON classifications(last_used)")
+        self.connection.commit()
+        # Prompt und Modell fliessen in den Schlüssel ein, Änderungen machen alte Einträge ungültig
+        self.namespace = hashlib.sha256(f"{model}\0{prompt_template}".encode("utf-8")).hexdigest()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{normalize_review(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[str, Dict[str, str]]:
+        keys = {self.make_key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), SQL_BATCH_SIZE):
+            batch = key_list[start:start + SQL_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, result FROM classifications WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, result in rows:
+                found[keys[key]] = json.loads(result)
+
+        # Zugriffszeit aktualisieren, damit häufig genutzte Einträge nicht verdrängt werden
+        now = time.time()
+        self.connection.executemany(
+            "UPDATE classifications SET last_used = ? WHERE key = ?",
+            [(now, self.make_key(text)) for text in found]
+        )
+        self.connection.commit()
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, results: Dict[str, Dict[str, str]]) -> None:
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO classifications (key, result, last_used) VALUES (?, ?, ?)",
+            [(self.make_key(text), json.dumps(result, ensure_ascii=False), now) for text, result in results.items()]
+        )
+        self.evict()
+        self.connection.commit()
+
+    def evict(self) -> None:
+        # LRU: die am längsten nicht genutzten Einträge werden entfernt
+        count = self.connection.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.connection.execute(
+                "DELETE FROM classifications WHERE key IN "
+                "(SELECT key FROM classifications ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            logger.info(f"{overflow} Einträge aus dem Cache entfernt.")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self.connection.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        }
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def classify_with_cache(
+    texts: List[str],
+    cache: ClassificationCache,
+    classify: Callable[[List[str]], List[Dict[str, str]]],
+    fallback: Optional[Dict[str, str]] = None
+) -> List[Dict[str, str]]:
+    unique_texts, inverse = deduplicate_reviews(texts)
+    logger.info(f"{len(texts)} Reviews, davon {len(unique_texts)} eindeutig.")
+
+    cached = cache.get_many(unique_texts)
+    missing = [text for text in unique_texts if text not in cached]
+    if missing:
+        new_results = dict(zip(missing, classify(missing)))
+        # Fallback-Ergebnisse (Fehler) werden nicht gespeichert, damit sie beim nächsten Lauf erneut versucht werden
+        cache.put_many({text: result for text, result in new_results.items() if result is not fallback})
+        cached.update(new_results)
+
+    stats = cache.stats()
+    logger.info(f"Cache: {stats['hits']} Treffer, {stats['misses']} Fehlgriffe ({stats['hit_rate']:.1%}).")
+    return [cached[unique_texts[position]] for position in inverse]
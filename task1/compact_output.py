@@ -0,0 +1,153 @@
+import json
+import logging
+from typing import Dict, List, Tuple
+import pandas as pd
+
+# Ein Zeichen pro Kategorie statt ganzer Wörter in der Antwort
+CODE_LABELS = {"p": "positiv", "n": "negativ", "0": "neutral", "-": "None"}
+LABEL_CODES = {label: code for code, label in CODE_LABELS.items()}
+LABEL_DTYPE = pd.CategoricalDtype(list(CODE_LABELS.values()))
+CATEGORY_KEYS = {"food": "f", "service": "s", "atmosphere": "a"}
+
+# {"f":"p","s":"-","a":"0"} sind rund 15 Tokens
+COMPACT_MAX_TOKENS = 20
+# Pro Review im gepackten Modus inkl. id
+COMPACT_TOKENS_PER_REVIEW = 22
+
+CODE_INSTRUCTION = (
+    "Codes pro Kategorie: p = positiv, n = negativ, 0 = neutral, - = nicht erwähnt oder nicht klassifizierbar. "
+    "Schlüssel: f = Essen, s = Service, a = Atmosphäre."
+)
+
+# Die Antwort steht als escapter JSON-String in der Ergebniszeile; Leerraum kann als \n escapt sein
+_SPACE = r"(?:\s|\\[nrt])*"
+_CODE_PATTERN = _SPACE.join(
+    [r'\\"f\\":', r'\\"(?P<food>[pn0\-])\\",', r'\\"s\\":', r'\\"(?P<service>[pn0\-])\\",', r'\\"a\\":', r'\\"(?P<atmosphere>[pn0\-])\\"']
+)
+_PACKED_CODE_PATTERN = _SPACE.join([r'\\"i\\":', r'\\"(?P<review_id>[^"\\]+)\\",', _CODE_PATTERN])
+_CUSTOM_ID_PATTERN = r'"custom_id":\s*"(?P<custom_id>[^"]+)"'
+
+logger = logging.getLogger(__name__)
+
+
+def _code_properties() -> dict:
+    return {key: {"type": "string", "enum": list(CODE_LABELS)} for key in CATEGORY_KEYS.values()}
+
+
+def review_schema() -> dict:
+    return {
+        "type": "object",
+        "properties": _code_properties(),
+        "required": list(CATEGORY_KEYS.values()),
+        "additionalProperties": False
+    }
+
+
+def packed_schema() -> dict:
+    item = {
+        "type": "object",
+        "properties": {"i": {"type": "string"}, **_code_properties()},
+        "required": ["i", *CATEGORY_KEYS.values()],
+        "additionalProperties": False
+    }
+    return {
+        "type": "object",
+        "properties": {"r": {"type": "array", "items": item}},
+        "required": ["r"],
+        "additionalProperties": False
+    }
+
+
+def chat_response_format(packed: bool = False) -> dict:
+    # Structured Outputs: das Modell kann nur schemakonforme Antworten erzeugen
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "review_ratings_packed" if packed else "review_ratings",
+            "strict": True,
+            "schema": packed_schema() if packed else review_schema()
+        }
+    }
+
+
+def responses_text_format(packed: bool = False) -> dict:
+    # Gleiches Schema für die Responses-API, dort unter text.format
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": "review_ratings_packed" if packed else "review_ratings",
+            "strict": True,
+            "schema": packed_schema() if packed else review_schema()
+        }
+    }
+
+
+def build_compact_prompt(text: str) -> str:
+    return (
+        "Bewerte den Ton des Kommentars zu Essen, Service und Atmosphäre. "
+        f"{CODE_INSTRUCTION}\n\n"
+        f"Kommentar: \"{text}\""
+    )
+
+
+def build_compact_packed_prompt(reviews: List[Tuple[str, str]]) -> str:
+    numbered_reviews = "\n".join(f"[{review_id}] \"{text}\"" for review_id, text in reviews)
+    return (
+        "Bewerte den Ton jedes Kommentars zu Essen, Service und Atmosphäre. "
+        f"{CODE_INSTRUCTION} i = id des Kommentars.\n\n"
+        f"Kommentare (mit id in eckigen Klammern):\n{numbered_reviews}"
+    )
+
+
+def decode_compact(item: dict) -> Dict[str, str]:
+    return {category: CODE_LABELS[item[key]] for category, key in CATEGORY_KEYS.items()}
+
+
+def parse_compact_response(content: str) -> Dict[str, str]:
+    return decode_compact(json.loads(content))
+
+
+def parse_compact_packed_response(content: str, expected_ids: List[str]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    results: Dict[str, Dict[str, str]] = {}
+    try:
+        items = json.loads(content)["r"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logger.warning(f"Kompakte Antwort konnte nicht geparst werden: {e}")
+        items = []
+    expected = set(expected_ids)
+    for item in items:
+        try:
+            if item["i"] in expected:
+                results[item["i"]] = decode_compact(item)
+        except (KeyError, TypeError):
+            continue
+    return results, [review_id for review_id in expected_ids if review_id not in results]
+
+
+def _to_categorical(codes: pd.DataFrame) -> pd.DataFrame:
+    # Codes über eine Zuordnung in kategorische Labels umwandeln, ohne Python-Schleife
+    return pd.DataFrame(
+        {category: codes[category].map(CODE_LABELS).astype(LABEL_DTYPE) for category in CATEGORY_KEYS},
+        index=codes.index
+    )
+
+
+def parse_compact_results(result_entries: List[str], packed: bool = False) -> pd.DataFrame:
+    # Alle Ergebniszeilen in einem Durchgang per Regex auswerten, statt zweimal json.loads pro Zeile
+    lines = pd.Series(result_entries, dtype=object)
+    if packed:
+        codes = lines.str.extractall(_PACKED_CODE_PATTERN).reset_index(drop=True).set_index("review_id")
+    else:
+        codes = pd.concat([lines.str.extract(_CUSTOM_ID_PATTERN), lines.str.extract(_CODE_PATTERN)], axis=1)
+        codes = codes.dropna().set_index("custom_id")
+    codes = codes[~codes.index.duplicated(keep="last")]
+    return _to_categorical(codes)
+
+
+def extract_usage(result_entries: List[str]) -> pd.DataFrame:
+    lines = pd.Series(result_entries, dtype=object)
+    usage = pd.concat(
+        [lines.str.extract(r'"prompt_tokens":\s*(?P<prompt_tokens>\d+)'), lines.str.extract(r'"completion_tokens":\s*(?P<completion_tokens>\d+)')],
+        axis=1
+    )
+    return usage.dropna().astype(int)
@@ -0,0 +1,103 @@
+import re
+import json
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Ein "*" am Anfang erlaubt Komposita ("*gericht" -> "Hauptgericht"),
+# ein "*" am Ende beliebige Fortsetzungen ("speise*" -> "Speisekarte")
+WILDCARD = "*"
+# Flexionsendungen werden pro Schlüsselwort angegeben ("kellner[in,innen]" -> "Kellnerin", "Kellnerinnen"),
+# eine allgemeine Liste würde z.B. "Musiker" auf "musik" abbilden
+SUFFIX_PATTERN = re.compile(r"(?P<word>.*?)\[(?P<suffixes>[^\]]*)\]")
+_GROUPS = {
+    (False, False): "plain",
+    (True, False): "compound",
+    (False, True): "prefix",
+    (True, True): "infix",
+}
+
+
+def _trie_pattern(terms: Set[str]) -> str:
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        # Das "?" ist gierig, längere Schlüsselwörter werden zuerst versucht
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if is_end else pattern
+
+    return build(trie)
+
+
+def parse_suffixes(word: str) -> Tuple[str, List[str]]:
+    match = SUFFIX_PATTERN.fullmatch(word)
+    if match is None:
+        return word, []
+    return match.group("word"), [suffix.strip() for suffix in match.group("suffixes").split(",") if suffix.strip()]
+
+
+def load_keywords(path: str) -> Dict[str, List[str]]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.term_categories: Dict[Tuple[str, str], Set[str]] = {}
+        group_terms: Dict[str, Set[str]] = {group: set() for group in _GROUPS.values()}
+        for category, words in keywords.items():
+            for word in words:
+                word, suffixes = parse_suffixes(word.strip().lower())
+                group = _GROUPS[(word.startswith(WILDCARD), word.endswith(WILDCARD) and len(word) > 1)]
+                term = word.strip(WILDCARD)
+                if not term:
+                    continue
+                # Jede erlaubte Endung wird als eigene Form in den Trie aufgenommen
+                for form in [term, *(term + suffix for suffix in suffixes)]:
+                    group_terms[group].add(form)
+                    self.term_categories.setdefault((group, form), set()).add(category)
+
+        templates = {
+            "plain": "(?P<plain>{trie})",
+            "compound": r"\w*?(?P<compound>{trie})",
+            "prefix": r"(?P<prefix>{trie})\w*",
+            "infix": r"\w*?(?P<infix>{trie})\w*",
+        }
+        alternatives = [
+            templates[group].format(trie=_trie_pattern(terms))
+            for group, terms in group_terms.items()
+            if terms
+        ]
+        # Ein einziger Ausdruck mit Wortgrenzen, ein Durchlauf pro Text
+        self.pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.IGNORECASE) if alternatives else None
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, Set[str]]]:
+        if self.pattern is None:
+            return
+        for match in self.pattern.finditer(text):
+            group = match.lastgroup
+            yield match.start(), self.term_categories[(group, match.group(group).lower())]
+
+    def categories(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        for _, categories in self.finditer(text):
+            found |= categories
+        return found
+
+    def categories_by_sentence(self, text: str, sentence_starts: List[int]) -> Dict[int, Set[str]]:
+        # Treffer werden über die Startposition dem jeweiligen Satz zugeordnet
+        hits: Dict[int, Set[str]] = {}
+        for start, categories in self.finditer(text):
+            sentence = bisect_right(sentence_starts, start) - 1
+            hits.setdefault(sentence, set()).update(categories)
+        return hits
@@ -0,0 +1,168 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# USD pro 1 Mio. Tokens (Prompt, Completion), Stand der OpenAI-Preisliste
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+}
+# Die Batch-API kostet die Hälfte
+BATCH_DISCOUNT = 0.5
+
+REQUEST_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_LATENCY_BUCKETS = (60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 21600.0, 43200.0, 86400.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_prometheus(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MetricsRecorder:
+    def __init__(self, model: str, run_id: Optional[str] = None):
+        self.model = model
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batch_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.parse_failures = 0
+        self.fallbacks = 0
+        self.reviews = 0
+        self.batches: List[dict] = []
+        self.request_latency = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.batch_latency = Histogram(BATCH_LATENCY_BUCKETS)
+        self.prompt_token_histogram = Histogram(TOKEN_BUCKETS)
+        self.completion_token_histogram = Histogram(TOKEN_BUCKETS)
+
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int, batch: bool = False) -> float:
+        prompt_price, completion_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        return cost * BATCH_DISCOUNT if batch else cost
+
+    def record_request(self, prompt_tokens: int, completion_tokens: int, latency: Optional[float] = None, batch: bool = False) -> None:
+        with self.lock:
+            self.requests += 1
+            self.batch_requests += int(batch)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += self.estimate_cost(prompt_tokens, completion_tokens, batch)
+            self.prompt_token_histogram.observe(prompt_tokens)
+            self.completion_token_histogram.observe(completion_tokens)
+            # Bei Batch-Anfragen gibt es keine Einzel-Latenz, nur die des ganzen Batches
+            if latency is not None:
+                self.request_latency.observe(latency)
+
+    def record_usage(self, usage, latency: Optional[float] = None, batch: bool = False) -> None:
+        # Akzeptiert sowohl Chat-Completions (prompt/completion) als auch Responses (input/output)
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            get = usage.get
+        else:
+            get = lambda key: getattr(usage, key, None)
+        prompt_tokens = get("prompt_tokens") or get("input_tokens") or 0
+        completion_tokens = get("completion_tokens") or get("output_tokens") or 0
+        self.record_request(prompt_tokens, completion_tokens, latency, batch)
+
+    def record_batch(self, batch_id: str, status: str, latency: Optional[float], request_count: int = 0) -> None:
+        with self.lock:
+            self.batches.append({"batch_id": batch_id, "status": status, "latency_seconds": latency, "requests": request_count})
+            if latency is not None:
+                self.batch_latency.observe(latency)
+
+    def record_parse_failure(self, count: int = 1) -> None:
+        with self.lock:
+            self.parse_failures += count
+
+    def record_fallback(self, count: int = 1) -> None:
+        with self.lock:
+            self.fallbacks += count
+
+    def record_reviews(self, count: int) -> None:
+        with self.lock:
+            self.reviews += count
+
+    def summary(self) -> dict:
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            return {
+                "run_id": self.run_id,
+                "model": self.model,
+                "elapsed_seconds": elapsed,
+                "reviews": self.reviews,
+                "reviews_per_second": self.reviews / elapsed if elapsed else 0.0,
+                "requests": self.requests,
+                "batch_requests": self.batch_requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "estimated_cost_usd": self.cost_usd,
+                "cost_per_1k_reviews_usd": self.cost_usd / self.reviews * 1000 if self.reviews else 0.0,
+                "parse_failures": self.parse_failures,
+                "fallbacks": self.fallbacks,
+                "mean_request_latency_seconds": self.request_latency.sum / self.request_latency.count if self.request_latency.count else None,
+                "batches": list(self.batches)
+            }
+
+    def to_prometheus(self) -> str:
+        labels = f'model="{self.model}",run="{self.run_id}"'
+        histograms = {
+            "review_classifier_request_latency_seconds": self.request_latency,
+            "review_classifier_batch_latency_seconds": self.batch_latency,
+            "review_classifier_prompt_tokens": self.prompt_token_histogram,
+            "review_classifier_completion_tokens": self.completion_token_histogram,
+        }
+        # Zählerstände und Histogramme unter dem Lock kopieren, formatiert wird danach
+        with self.lock:
+            counters = {
+                "review_classifier_reviews_total": self.reviews,
+                "review_classifier_requests_total": self.requests,
+                "review_classifier_prompt_tokens_total": self.prompt_tokens,
+                "review_classifier_completion_tokens_total": self.completion_tokens,
+                "review_classifier_cost_usd_total": self.cost_usd,
+                "review_classifier_parse_failures_total": self.parse_failures,
+                "review_classifier_fallbacks_total": self.fallbacks,
+            }
+            histogram_lines = {name: histogram.to_prometheus(name, labels) for name, histogram in histograms.items()}
+        lines = []
+        for name, value in counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{{{labels}}} {value}")
+        for name, histogram_line in histogram_lines.items():
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(histogram_line)
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path: str, prometheus_path: str) -> None:
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+        with open(prometheus_path, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
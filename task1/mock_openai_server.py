@@ -0,0 +1,399 @@
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from tokens import estimate_tokens
+
+HOST = "127.0.0.1"
+PORT = 8787
+
+POSITIVE_WORDS = ("gut", "super", "lecker", "toll", "freundlich", "top", "schön", "hervorragend", "empfehlen")
+NEGATIVE_WORDS = ("schlecht", "langsam", "unfreundlich", "kalt", "teuer", "laut", "enttäuschend", "nie wieder")
+ASPECT_WORDS = {
+    "food": ("essen", "gericht", "speise", "menu", "menü", "pizza", "food"),
+    "service": ("service", "bedienung", "kellner", "personal"),
+    "atmosphere": ("ambiente", "atmosphäre", "musik", "einrichtung"),
+}
+PACKED_REVIEW_PATTERN = re.compile(r"^\[(?P<id>[^\]]+)\] \"(?P<text>.*)\"$", re.MULTILINE)
+SINGLE_REVIEW_PATTERN = re.compile(r"Kommentar: \"(?P<text>.*)\"", re.DOTALL)
+# Codes des kompakten Antwortformats (siehe compact_output.py)
+LABEL_CODES = {"positiv": "p", "negativ": "n", "neutral": "0", "None": "-"}
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        latency_jitter: float = 0.1,
+        requests_per_minute: Optional[int] = None,
+        error_rate_429: float = 0.0,
+        max_context_tokens: int = 8_192,
+        max_enqueued_tokens: int = 90_000,
+        batch_latency: float = 2.0
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.requests_per_minute = requests_per_minute
+        self.error_rate_429 = error_rate_429
+        self.max_context_tokens = max_context_tokens
+        self.max_enqueued_tokens = max_enqueued_tokens
+        self.batch_latency = batch_latency
+
+
+def fake_labels(text: str) -> Dict[str, str]:
+    # Deterministische Heuristik statt eines echten Modells
+    lowered = text.lower()
+    polarity = sum(word in lowered for word in POSITIVE_WORDS) - sum(word in lowered for word in NEGATIVE_WORDS)
+    label = "positiv" if polarity > 0 else "negativ" if polarity < 0 else "neutral"
+    return {
+        aspect: label if any(word in lowered for word in words) else "None"
+        for aspect, words in ASPECT_WORDS.items()
+    }
+
+
+def fake_compact_labels(text: str) -> Dict[str, str]:
+    labels = fake_labels(text)
+    return {"f": LABEL_CODES[labels["food"]], "s": LABEL_CODES[labels["service"]], "a": LABEL_CODES[labels["atmosphere"]]}
+
+
+def fake_answer(prompt: str, compact: bool = False) -> str:
+    packed = PACKED_REVIEW_PATTERN.findall(prompt)
+    if packed and compact:
+        return json.dumps({"r": [{"i": review_id, **fake_compact_labels(text)} for review_id, text in packed]}, separators=(",", ":"))
+    if packed:
+        return json.dumps([{"id": review_id, **fake_labels(text)} for review_id, text in packed], ensure_ascii=False)
+    match = SINGLE_REVIEW_PATTERN.search(prompt)
+    text = match.group("text") if match else prompt
+    if compact:
+        return json.dumps(fake_compact_labels(text), separators=(",", ":"))
+    return json.dumps(fake_labels(text), ensure_ascii=False)
+
+
+def parse_multipart(body: bytes, content_type: str) -> Dict[str, Tuple[Optional[str], bytes]]:
+    boundary = content_type.split("boundary=")[1].strip('"').encode()
+    fields = {}
+    for part in body.split(b"--" + boundary):
+        if b"\r\n\r\n" not in part:
+            continue
+        headers, value = part.split(b"\r\n\r\n", 1)
+        disposition = headers.decode("utf-8", errors="replace")
+        name = re.search(r'name="([^"]*)"', disposition)
+        filename = re.search(r'filename="([^"]*)"', disposition)
+        if name:
+            fields[name.group(1)] = (filename.group(1) if filename else None, value[:-2] if value.endswith(b"\r\n") else value)
+    return fields
+
+
+class MockOpenAIState:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.lock = threading.RLock()
+        self.files: Dict[str, dict] = {}
+        self.file_contents: Dict[str, bytes] = {}
+        self.batches: Dict[str, dict] = {}
+        self.request_times: List[float] = []
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.request_times.clear()
+            self.latencies.clear()
+            self.status_counts.clear()
+
+    def record(self, status: int, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.status_counts[str(status)] = self.status_counts.get(str(status), 0) + 1
+
+    def rate_limited(self) -> bool:
+        if random.random() < self.config.error_rate_429:
+            return True
+        if not self.config.requests_per_minute:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.request_times = [t for t in self.request_times if now - t < 60]
+            if len(self.request_times) >= self.config.requests_per_minute:
+                return True
+            self.request_times.append(now)
+        return False
+
+    def add_file(self, filename: str, purpose: str, content: bytes) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        file_object = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        with self.lock:
+            self.files[file_id] = file_object
+            self.file_contents[file_id] = content
+        return file_object
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> dict:
+        content = self.file_contents[input_file_id].decode("utf-8")
+        lines = [json.loads(line) for line in content.splitlines() if line.strip()]
+        enqueued_tokens = sum(
+            estimate_tokens(" ".join(message["content"] for message in line["body"]["messages"]))
+            for line in lines
+        )
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "errors": None,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0}
+        }
+        if enqueued_tokens > self.config.max_enqueued_tokens:
+            batch["status"] = "failed"
+            batch["errors"] = {"object": "list", "data": [{
+                "code": "token_limit_exceeded",
+                "message": f"Enqueued token limit reached ({enqueued_tokens} > {self.config.max_enqueued_tokens})."
+            }]}
+        with self.lock:
+            self.batches[batch_id] = {"object": batch, "lines": lines, "started": time.monotonic()}
+        return batch
+
+    def retrieve_batch(self, batch_id: str) -> dict:
+        with self.lock:
+            entry = self.batches[batch_id]
+            batch = entry["object"]
+            if batch["status"] in {"validating", "in_progress"}:
+                elapsed = time.monotonic() - entry["started"]
+                if elapsed >= self.config.batch_latency:
+                    self._complete_batch(entry)
+                elif elapsed >= self.config.batch_latency / 2:
+                    batch["status"] = "in_progress"
+            return batch
+
+    def _complete_batch(self, entry: dict) -> None:
+        output = []
+        for line in entry["lines"]:
+            completion = chat_completion(line["body"])
+            output.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                "custom_id": line["custom_id"],
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": completion},
+                "error": None
+            }, ensure_ascii=False))
+        output_file = self.add_file("batch_output.jsonl", "batch_output", "\n".join(output).encode("utf-8"))
+        batch = entry["object"]
+        batch["status"] = "completed"
+        batch["output_file_id"] = output_file["id"]
+        batch["request_counts"]["completed"] = len(output)
+
+
+def chat_completion(body: dict) -> dict:
+    prompt = "\n".join(message["content"] for message in body["messages"])
+    # Mit JSON-Schema antwortet das Modell im kompakten Format
+    answer = fake_answer(prompt, compact=body.get("response_format", {}).get("type") == "json_schema")
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(answer)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+
+def response_object(body: dict) -> dict:
+    prompt = body["input"] if isinstance(body["input"], str) else json.dumps(body["input"], ensure_ascii=False)
+    answer = fake_answer(prompt, compact=body.get("text", {}).get("format", {}).get("type") == "json_schema")
+    input_tokens = estimate_tokens(prompt)
+    output_tokens = estimate_tokens(answer)
+    return {
+        "id": f"resp_{uuid.uuid4().hex[:24]}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "mock"),
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": answer, "annotations": []}]
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+    }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    state: MockOpenAIState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_bytes(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": code, "code": code, "param": None}}, headers)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _simulate_latency(self) -> None:
+        config = self.state.config
+        time.sleep(max(0.0, random.gauss(config.latency, config.latency_jitter)))
+
+    def do_GET(self):
+        start = time.perf_counter()
+        status = 200
+        path = self.path.split("?")[0]
+        if path == "/mock/stats":
+            with self.state.lock:
+                self._send_json(200, {"latencies": list(self.state.latencies), "status_counts": dict(self.state.status_counts)})
+            return
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match and match.group(1) in self.state.file_contents:
+            self._send_bytes(200, self.state.file_contents[match.group(1)], "application/octet-stream")
+        elif re.fullmatch(r"/v1/files/([^/]+)", path) and path.rsplit("/", 1)[1] in self.state.files:
+            self._send_json(200, self.state.files[path.rsplit("/", 1)[1]])
+        elif re.fullmatch(r"/v1/batches/([^/]+)", path) and path.rsplit("/", 1)[1] in self.state.batches:
+            self._send_json(200, self.state.retrieve_batch(path.rsplit("/", 1)[1]))
+        else:
+            status = 404
+            self._send_error(404, "not_found", f"Unknown path {path}")
+        self.state.record(status, time.perf_counter() - start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        path = self.path.split("?")[0]
+        body = self._read_body()
+        status = self._handle_post(path, body)
+        if not path.startswith("/mock/"):
+            self.state.record(status, time.perf_counter() - start)
+
+    def _handle_post(self, path: str, body: bytes) -> int:
+        if path == "/mock/reset":
+            self.state.reset_stats()
+            self._send_json(200, {"ok": True})
+            return 200
+        if path == "/v1/files":
+            fields = parse_multipart(body, self.headers["Content-Type"])
+            filename, content = fields["file"]
+            purpose = fields.get("purpose", (None, b"batch"))[1].decode()
+            self._send_json(200, self.state.add_file(filename or "upload.jsonl", purpose, content))
+            return 200
+        if path == "/v1/batches":
+            payload = json.loads(body)
+            if payload.get("input_file_id") not in self.state.file_contents:
+                self._send_error(404, "not_found", "Input file not found.")
+                return 404
+            self._send_json(200, self.state.create_batch(
+                payload["input_file_id"], payload.get("endpoint", "/v1/chat/completions"), payload.get("completion_window", "24h")
+            ))
+            return 200
+        if path in {"/v1/chat/completions", "/v1/responses"}:
+            return self._handle_completion(path, json.loads(body))
+        self._send_error(404, "not_found", f"Unknown path {path}")
+        return 404
+
+    def _handle_completion(self, path: str, payload: dict) -> int:
+        if self.state.rate_limited():
+            self._send_error(429, "rate_limit_exceeded", "Rate limit reached.", {"Retry-After": "1"})
+            return 429
+        if path == "/v1/chat/completions":
+            prompt = "\n".join(message["content"] for message in payload["messages"])
+        else:
+            prompt = payload["input"] if isinstance(payload["input"], str) else json.dumps(payload["input"])
+        if estimate_tokens(prompt) > self.state.config.max_context_tokens:
+            self._send_error(400, "context_length_exceeded", "This model's maximum context length was exceeded.")
+            return 400
+        self._simulate_latency()
+        self._send_json(200, chat_completion(payload) if path == "/v1/chat/completions" else response_object(payload))
+        return 200
+
+
+class MockOpenAIServer:
+    def __init__(self, host: str = HOST, port: int = PORT, config: Optional[MockConfig] = None):
+        self.state = MockOpenAIState(config or MockConfig())
+        handler = type("BoundMockOpenAIHandler", (MockOpenAIHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Ersatz für die OpenAI-API (Files, Batches, Chat Completions, Responses).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mittlere Antwortzeit in Sekunden")
+    parser.add_argument("--latency-jitter", type=float, default=0.1)
+    parser.add_argument("--rpm", type=int, default=None, help="Requests pro Minute, danach 429")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="Anteil zufälliger 429-Antworten")
+    parser.add_argument("--max-context-tokens", type=int, default=8_192)
+    parser.add_argument("--max-enqueued-tokens", type=int, default=90_000)
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="Sekunden bis ein Batch abgeschlossen ist")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        requests_per_minute=args.rpm,
+        error_rate_429=args.error_rate_429,
+        max_context_tokens=args.max_context_tokens,
+        max_enqueued_tokens=args.max_enqueued_tokens,
+        batch_latency=args.batch_latency
+    )
+    server = MockOpenAIServer(args.host, args.port, config)
+    logger.info(f"Mock-Server läuft auf {server.base_url} (OPENAI_BASE_URL setzen).")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        if capacity <= 0 or refill_per_second <= 0:
+            raise ValueError("Capacity and refill rate must be positive.")
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        # Anfragen grösser als die Kapazität würden sonst nie durchgelassen
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        # Der Lock sorgt dafür, dass wartende Anfragen in Reihenfolge bedient werden
+        async with self._lock:
+            while True:
+                delay = max(
+                    self.paused_until - time.monotonic(),
+                    self.request_bucket.wait_time(1),
+                    self.token_bucket.wait_time(tokens),
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+
+    def pause(self, seconds: float) -> None:
+        # Nach einem 429 werden alle Anfragen angehalten, nicht nur die betroffene
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -0,0 +1,118 @@
+import os
+import asyncio
+import logging
+from typing import Callable, Dict, List, Set, Tuple
+from classification_cache import CACHE_FILE, ClassificationCache, classify_with_cache
+from review_classifier_nltk import BATCH_SIZE, N_PROCESS, analyze_reviews_batched, classify_analyzed
+from compact_output import build_compact_packed_prompt
+from review_classifier_seriell import COMPACT_OUTPUT, MODEL_NAME, ReviewClassifier
+from review_common import DEFAULT_RESULT
+from review_packing import build_packed_prompt
+from streaming_io import write_classified_csv
+
+INPUT_FILE = "task_1_google_maps_comments.csv"
+OUTPUT_FILE = "classified_reviews.csv"
+
+# Unterhalb dieser Konfidenz wird ein Review an das LLM weitergegeben
+CONFIDENCE_THRESHOLD = 0.3
+# Längere Reviews ohne erkannten Aspekt sind verdächtig: die Schlüsselwörter haben vermutlich etwas übersehen
+MIN_WORDS_WITHOUT_ASPECT = 12
+# Lokale Labels an das Vokabular der LLM-Prompts angleichen
+LOCAL_TO_LLM_LABELS = {"positive": "positiv", "negative": "negativ", "neutral": "neutral", "None": "None"}
+
+logger = logging.getLogger(__name__)
+
+
+def aspect_confidences(analyzed: List[Tuple[str, Set[str], float]], n_words: int) -> Tuple[Dict[str, float], bool]:
+    scores: Dict[str, List[float]] = {category: [] for category in DEFAULT_RESULT}
+    for _, categories, score in analyzed:
+        for category in categories:
+            scores[category].append(score)
+
+    confidences = {}
+    for category, category_scores in scores.items():
+        if category_scores:
+            # Der letzte Satz bestimmt das lokale Label, sein |compound| dient als Konfidenz
+            confidences[category] = abs(category_scores[-1])
+        else:
+            confidences[category] = 0.0 if not analyzed and n_words >= MIN_WORDS_WITHOUT_ASPECT else 1.0
+
+    # Gemischte Polarität: ein Aspekt oder mehrere Aspekte mit gegensätzlichen Tonlagen
+    signs = {score > 0 for category_scores in scores.values() for score in category_scores if abs(score) >= 0.1}
+    return confidences, len(signs) > 1
+
+
+class ReviewCascade:
+    def __init__(
+        self,
+        llm_classify: Callable[[List[str]], List[Dict[str, str]]],
+        threshold: float = CONFIDENCE_THRESHOLD,
+        batch_size: int = BATCH_SIZE,
+        n_process: int = N_PROCESS
+    ):
+        self.llm_classify = llm_classify
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.stats = {"total": 0, "local": 0, "llm": 0, "low_confidence": 0, "mixed_polarity": 0}
+
+    def needs_llm(self, analyzed: List[Tuple[str, Set[str], float]], text: str) -> bool:
+        confidences, mixed = aspect_confidences(analyzed, len(text.split()))
+        if mixed:
+            self.stats["mixed_polarity"] += 1
+            return True
+        if min(confidences.values()) < self.threshold:
+            self.stats["low_confidence"] += 1
+            return True
+        return False
+
+    def classify(self, texts: List[str]) -> List[Dict[str, str]]:
+        analyzed_reviews = analyze_reviews_batched(texts, self.batch_size, self.n_process)
+        results = []
+        routed = []
+        for position, (text, analyzed) in enumerate(zip(texts, analyzed_reviews)):
+            if self.needs_llm(analyzed, text):
+                routed.append(position)
+                results.append(None)
+            else:
+                local = classify_analyzed(analyzed)
+                results.append({category: LOCAL_TO_LLM_LABELS[label] for category, label in local.items()})
+
+        if routed:
+            llm_results = self.llm_classify([texts[position] for position in routed])
+            for position, result in zip(routed, llm_results):
+                results[position] = result
+
+        self.stats["total"] += len(texts)
+        self.stats["llm"] += len(routed)
+        self.stats["local"] += len(texts) - len(routed)
+        logger.info(
+            f"Routing: {len(routed)} von {len(texts)} Reviews ans LLM ({self.routing_ratio():.1%}), "
+            f"davon {self.stats['mixed_polarity']} mit gemischter Polarität."
+        )
+        return results
+
+    def routing_ratio(self) -> float:
+        return self.stats["llm"] / self.stats["total"] if self.stats["total"] else 0.0
+
+
+def main():
+    analyzer = ReviewClassifier(os.getenv("OPENAI_API_KEY"))
+    prompt_template = (build_compact_packed_prompt if COMPACT_OUTPUT else build_packed_prompt)([("{id}", "{review}")])
+    cache = ClassificationCache(CACHE_FILE, prompt_template, MODEL_NAME)
+
+    def llm_classify(texts: List[str]) -> List[Dict[str, str]]:
+        return classify_with_cache(
+            texts, cache, lambda missing: asyncio.run(analyzer.classify_reviews_packed_async(missing)), fallback=DEFAULT_RESULT
+        )
+
+    cascade = ReviewCascade(llm_classify)
+    # Chunkweise lesen, routen und schreiben, damit der Speicherbedarf nicht mit der Eingabe wächst
+    try:
+        write_classified_csv(INPUT_FILE, OUTPUT_FILE, cascade.classify)
+    finally:
+        cache.close()
+    print(f"Routing-Quote: {cascade.routing_ratio():.1%} der Reviews wurden vom LLM klassifiziert.")
+
+if __name__ == "__main__":
+    main()
@@ -4,43 +4,40 @@ import time
 import pandas as pd
 import logging
 from openai import OpenAI
-from typing import Dict, List
+from typing import Dict, Iterable, List, Tuple
+from classification_cache import CACHE_FILE, ClassificationCache, classify_with_cache
+from compact_output import COMPACT_MAX_TOKENS, build_compact_prompt, chat_response_format, extract_usage, parse_compact_results
+from metrics import MetricsRecorder
+from review_common import DEFAULT_RESULT, build_prompt
+from streaming_io import dumps_line, iter_reviews, write_classified_csv
 
-MODEL_NAME = "gpt-4-turbo"
-DEFAULT_RESULT = {"food": "None", "service": "None", "atmosphere": "None"}
+# Kompakte Antworten (p/n/0/-) mit JSON-Schema; Structured Outputs benötigen ein gpt-4o-Modell
+COMPACT_OUTPUT = True
+MODEL_NAME = "gpt-4o-mini" if COMPACT_OUTPUT else "gpt-4-turbo"
 CSV_INPUT = "task_1_google_maps_comments.csv"
 JSONL_OUTPUT = "batch_input.jsonl"
 CSV_OUTPUT = "classified_reviews.csv"
+METRICS_JSON = "metrics_summary.json"
+METRICS_PROMETHEUS = "metrics.prom"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 class BatchJsonBuilder:
-    def build_prompt(self, text: str) -> str:
-        return (
-            
-        "Analysiere den Ton des folgenden Kommentars zu Essen, Service und Atmosphäre. "
-        "Gib für jede Kategorie an: positiv, neutral, negativ oder None (wenn nicht erwähnt).\n\n"
-            f"Kommentar: \"{text}\"\n\n"
-            "Antwortformat (JSON), kein Markdown-Syntax:\n"
-            "{\n"
-            "  \"food\": \"...\",\n"
-            "  \"service\": \"...\",\n"
-            "  \"atmosphere\": \"...\"\n"
-            "}"
-        )
-    
     def truncate_review(self, text: str, max_words: int = 200) -> str:
         words = text.split()
         return " ".join(words[:max_words])
     
     def generate_batch_jsonl(self, csv_path: str, jsonl_path: str) -> None:
-        df = pd.read_csv(csv_path)
-        with open(jsonl_path, "w", encoding="utf-8") as file:
-            for index, row in df.iterrows():
-                review = self.truncate_review(str(row["review"]))
-                prompt = self.build_prompt(review)
+        # Die CSV wird in Chunks gelesen, damit der Speicherbedarf konstant bleibt
+        self.write_batch_jsonl(iter_reviews(csv_path), jsonl_path)
+
+    def write_batch_jsonl(self, reviews: Iterable[Tuple[str, str]], jsonl_path: str) -> None:
+        with open(jsonl_path, "wb") as file:
+            for index, text in reviews:
+                review = self.truncate_review(text)
+                prompt = build_compact_prompt(review) if COMPACT_OUTPUT else build_prompt(review)
                 entry = {
                     "custom_id": str(index),
                     "method": "POST",
@@ -54,7 +51,10 @@ class BatchJsonBuilder:
                         "temperature": 0
                     }
                 }
-                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                if COMPACT_OUTPUT:
+                    entry["body"]["response_format"] = chat_response_format()
+                    entry["body"]["max_tokens"] = COMPACT_MAX_TOKENS
+                file.write(dumps_line(entry))
         logger.info("Batch-Input-Datei erfolgreich erstellt.")
 
 class OpenAIBatchRunner:
@@ -62,10 +62,11 @@ class OpenAIBatchRunner:
         if not api_key:
             raise ValueError("API key not found. Please set the OPENAI_API_KEY environment variable.")
         self.client = OpenAI(api_key=api_key)
+        self.metrics = MetricsRecorder(MODEL_NAME)
 
     def run_batch_job(self, jsonl_path: str) -> List[str]:
         uploaded_file = self.upload_batch_file(jsonl_path)
-        batch_job = self._tart_batch(uploaded_file.id)
+        batch_job = self.start_batch(uploaded_file.id)
         self.wait_for_completion(batch_job.id)
         return self.download_results(batch_job.id)
 
@@ -87,16 +88,32 @@ class OpenAIBatchRunner:
     def wait_for_completion(self, batch_id: str):
         while True:
             batch_job = self.client.batches.retrieve(batch_id)
-            logger.info(f"Aktueller Status: {batch_job.status}")
+            counts = batch_job.request_counts
+            progress = f" ({counts.completed}/{counts.total} Anfragen, {counts.failed} fehlgeschlagen)" if counts else ""
+            logger.info(f"Aktueller Status: {batch_job.status}{progress}")
             logger.info(f"Aktueller Status: {batch_job.errors}")
             if batch_job.status == "completed":
                 logger.info(f"Batch {batch_id} abgeschlossen.")
+                self.record_batch_metrics(batch_job)
                 break
+            if batch_job.status in {"failed", "expired", "cancelled"}:
+                self.record_batch_metrics(batch_job)
+                raise RuntimeError(f"Batch {batch_id} beendet mit Status {batch_job.status}: {batch_job.errors}")
             time.sleep(10)
 
+    def record_batch_metrics(self, batch_job) -> None:
+        # Latenz von der Einreichung bis zum Abschluss des Batches
+        finished_at = batch_job.completed_at or batch_job.failed_at or batch_job.expired_at or batch_job.cancelled_at
+        latency = finished_at - batch_job.created_at if finished_at else None
+        total = batch_job.request_counts.total if batch_job.request_counts else 0
+        self.metrics.record_batch(batch_job.id, batch_job.status, latency, total)
+
     def download_results(self, batch_id: str) -> List[str]:
         batch_job = self.client.batches.retrieve(batch_id)
-        result_file = self.client.files.content(batch_job.output_file_id).content
+        return self.download_file_lines(batch_job.output_file_id)
+
+    def download_file_lines(self, file_id: str) -> List[str]:
+        result_file = self.client.files.content(file_id).content
         return result_file.decode("utf-8").strip().split("\n")
 
     def parse_results(self, result_entries: List[str]) -> pd.DataFrame:
@@ -104,28 +121,68 @@ class OpenAIBatchRunner:
         for entry in result_entries:
             try:
                 item = json.loads(entry)
+                self.metrics.record_usage(item["response"]["body"].get("usage"), batch=True)
                 content = item["response"]["body"]["choices"][0]["message"]["content"]
                 results.append(json.loads(content))
             except Exception as e:
                 logger.warning(f"Fehler beim Parsen eines Eintrags: {e}")
+                self.metrics.record_parse_failure()
+                self.metrics.record_fallback()
                 results.append(DEFAULT_RESULT)
         return pd.DataFrame(results)
 
+    def parse_results_by_id(self, result_entries: List[str]) -> Dict[str, Dict[str, str]]:
+        results = {}
+        for entry in result_entries:
+            try:
+                item = json.loads(entry)
+                self.metrics.record_usage(item["response"]["body"].get("usage"), batch=True)
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+                results[item["custom_id"]] = json.loads(content)
+            except Exception as e:
+                logger.warning(f"Fehler beim Parsen eines Eintrags: {e}")
+                self.metrics.record_parse_failure()
+        return results
+
+    def parse_compact_results_by_id(self, result_entries: List[str]) -> Dict[str, Dict[str, str]]:
+        # Alle Zeilen in einem Durchgang in kategorische Spalten dekodieren
+        result_df = parse_compact_results(result_entries)
+        for prompt_tokens, completion_tokens in extract_usage(result_entries).itertuples(index=False):
+            self.metrics.record_request(prompt_tokens, completion_tokens, batch=True)
+        failures = len(result_entries) - len(result_df)
+        if failures:
+            logger.warning(f"{failures} Einträge ohne gültige kompakte Antwort.")
+            self.metrics.record_parse_failure(failures)
+        return result_df.astype(str).to_dict("index")
+
+def classify_texts(builder: BatchJsonBuilder, runner: OpenAIBatchRunner, reviews: List[str]) -> List[Dict[str, str]]:
+    builder.write_batch_jsonl(enumerate(reviews), JSONL_OUTPUT)
+    result_entries = runner.run_batch_job(JSONL_OUTPUT)
+    if COMPACT_OUTPUT:
+        results = runner.parse_compact_results_by_id(result_entries)
+    else:
+        results = runner.parse_results_by_id(result_entries)
+    runner.metrics.record_fallback(sum(str(index) not in results for index in range(len(reviews))))
+    return [results.get(str(index), DEFAULT_RESULT) for index in range(len(reviews))]
+
 def main():
     api_key = os.getenv("OPENAI_API_KEY")
     builder = BatchJsonBuilder()
     runner = OpenAIBatchRunner(api_key)
 
-    builder.generate_batch_jsonl(CSV_INPUT, JSONL_OUTPUT)
-    result_entries = runner.run_batch_job(JSONL_OUTPUT)
-    result_df = runner.parse_results(result_entries)
-
-    input_df = pd.read_csv(CSV_INPUT)
-    input_df.insert(3, "food_rating", result_df["food"])
-    input_df.insert(4, "service_rating", result_df["service"])
-    input_df.insert(5, "atmosphere_rating", result_df["atmosphere"])
-
-    input_df.to_csv(CSV_OUTPUT, index=False)
+    # Gleiche Reviews nur einmal klassifizieren, bekannte Ergebnisse aus dem Cache lesen
+    prompt_template = build_compact_prompt("{review}") if COMPACT_OUTPUT else build_prompt("{review}")
+    cache = ClassificationCache(CACHE_FILE, prompt_template, MODEL_NAME)
+    # Ein Batch-Job pro Chunk der Eingabe, die Ausgabe wird chunkweise geschrieben
+    try:
+        rows = write_classified_csv(
+            CSV_INPUT, CSV_OUTPUT,
+            lambda texts: classify_with_cache(texts, cache, lambda missing: classify_texts(builder, runner, missing), fallback=DEFAULT_RESULT)
+        )
+    finally:
+        cache.close()
+    runner.metrics.record_reviews(rows)
+    runner.metrics.export(METRICS_JSON, METRICS_PROMETHEUS)
     logger.info("Bewertungen gespeichert in classified_reviews.csv.")
 
 if __name__ == "__main__":
@@ -1,69 +1,211 @@
 import os
 import json
 import time
+import hashlib
 import pandas as pd
 import logging
 from openai import OpenAI
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
+from batch_orchestrator import BatchOrchestrator
+from classification_cache import CACHE_FILE, ClassificationCache, classify_with_cache
+from compact_output import (
+    COMPACT_MAX_TOKENS, COMPACT_TOKENS_PER_REVIEW, build_compact_packed_prompt, build_compact_prompt,
+    chat_response_format, extract_usage, parse_compact_results
+)
+from metrics import MetricsRecorder
+from review_common import DEFAULT_RESULT, build_prompt
+from review_packing import OUTPUT_TOKENS_PER_REVIEW, build_packed_prompt, pack_reviews, packed_output_tokens, parse_packed_response
+from streaming_io import dumps_line, write_classified_csv
+from tokens import estimate_chat_tokens
 
-MODEL_NAME = "gpt-4-turbo"
-DEFAULT_RESULT = {"food": "None", "service": "None", "atmosphere": "None"}
+# Kompakte Antworten (p/n/0/-) mit JSON-Schema; Structured Outputs benötigen ein gpt-4o-Modell
+COMPACT_OUTPUT = True
+MODEL_NAME = "gpt-4o-mini" if COMPACT_OUTPUT else "gpt-4-turbo"
 INPUT_FILE = "task_1_google_maps_comments.csv"
 OUTPUT_FILE = "classified_reviews.csv"
 
+# Limiten der Batch-API (Enqueued-Token-Limit gemäss Rate-Limit-Seite des Kontos)
+MAX_ENQUEUED_TOKENS = 90_000
+MAX_FILE_BYTES = 200 * 1024 * 1024
+MAX_REQUESTS_PER_BATCH = 50_000
+MAX_OUTPUT_TOKENS = 60
+# Reserve, weil die Token-Schätzung ungenau sein kann
+TOKEN_SAFETY_MARGIN = 0.9
+
+# Mehrere Reviews pro Anfrage senden (gepackter Modus)
+PACKED_MODE = True
+MAX_PACK_PROMPT_TOKENS = 3_000
+MAX_PACK_OUTPUT_TOKENS = 1_000
+MAX_PACK_RETRIES = 2
+
+# Parallele Verarbeitung der Chunks
+MAX_ACTIVE_BATCHES = 10
+WORK_DIR = "batches"
+STATE_FILE_NAME = "batch_state.json"
+
+# Export der Token-, Kosten- und Latenzmetriken
+METRICS_JSON = "metrics_summary.json"
+METRICS_PROMETHEUS = "metrics.prom"
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 class BatchJsonBuilder:
-    def build_prompt(self, text: str) -> str:
-        return (
-        "Analysiere den Ton des folgenden Kommentars zu Essen, Service und Atmosphäre. "
-        "Gib für jede Kategorie an: positiv, neutral, negativ oder None (wenn nicht erwähnt).\n\n"
-            f"Kommentar: \"{text}\"\n\n"
-            "Antwortformat (JSON), kein Markdown-Syntax:\n"
-            "{\n"
-            "  \"food\": \"...\",\n"
-            "  \"service\": \"...\",\n"
-            "  \"atmosphere\": \"...\"\n"
-            "}"
-        )
-    
+    def __init__(self):
+        # Geschätzte Tokens pro erzeugter Chunk-Datei
+        self.chunk_tokens: Dict[str, int] = {}
+        # Review-IDs pro gepackter Anfrage (custom_id)
+        self.pack_members: Dict[str, List[str]] = {}
+
     def truncate_review(self, text: str, max_words: int = 50) -> str:
         words = text.split()
         return " ".join(words[:max_words])
     
-    def generate_batch_jsonl_with_chunking(self, csv_path: str, output_dir: str, chunk_size: int = 50) -> list:
-        df = pd.read_csv(csv_path)
+    def build_entry(self, custom_id: str, review: str) -> dict:
+        entry = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": MODEL_NAME,
+                "messages": [
+                    {"role": "system", "content": "Du bist ein hilfsbereiter Assistent."},
+                    {"role": "user", "content": build_compact_prompt(review) if COMPACT_OUTPUT else build_prompt(review)}
+                ],
+                "temperature": 0,
+                "max_tokens": COMPACT_MAX_TOKENS if COMPACT_OUTPUT else MAX_OUTPUT_TOKENS
+            }
+        }
+        if COMPACT_OUTPUT:
+            entry["body"]["response_format"] = chat_response_format()
+        return entry
+
+    def estimate_entry_tokens(self, entry: dict) -> int:
+        body = entry["body"]
+        return estimate_chat_tokens(body["messages"], MODEL_NAME) + body.get("max_tokens", 0)
+
+    def fit_entry_to_budget(self, custom_id: str, review: str, token_budget: int) -> dict:
+        entry = self.build_entry(custom_id, review)
+        tokens = self.estimate_entry_tokens(entry)
+        while tokens > token_budget:
+            words = review.split()
+            max_words = int(len(words) * token_budget / tokens) - 1
+            if max_words <= 0:
+                raise ValueError(f"Review {custom_id} passt nicht in das Token-Budget von {token_budget}.")
+            review = self.truncate_review(review, max_words)
+            logger.warning(f"Review {custom_id} auf {max_words} Wörter gekürzt.")
+            entry = self.build_entry(custom_id, review)
+            tokens = self.estimate_entry_tokens(entry)
+        return entry
+
+    def generate_batch_jsonl_with_token_budget(
+        self,
+        reviews: List[Tuple[str, str]],
+        output_dir: str,
+        max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        max_requests: int = MAX_REQUESTS_PER_BATCH
+    ) -> list:
+        token_budget = int(max_enqueued_tokens * TOKEN_SAFETY_MARGIN)
+        entries = (
+            self.fit_entry_to_budget(review_id, review, token_budget)
+            for review_id, review in reviews
+        )
+        return self.write_token_budget_chunks(entries, output_dir, max_enqueued_tokens, max_file_bytes, max_requests)
+
+    def build_packed_entry(self, custom_id: str, pack: List[Tuple[str, str]]) -> dict:
+        entry = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": MODEL_NAME,
+                "messages": [
+                    {"role": "system", "content": "Du bist ein hilfsbereiter Assistent."},
+                    {"role": "user", "content": build_compact_packed_prompt(pack) if COMPACT_OUTPUT else build_packed_prompt(pack)}
+                ],
+                "temperature": 0,
+                "max_tokens": packed_output_tokens(len(pack), COMPACT_TOKENS_PER_REVIEW if COMPACT_OUTPUT else OUTPUT_TOKENS_PER_REVIEW)
+            }
+        }
+        if COMPACT_OUTPUT:
+            entry["body"]["response_format"] = chat_response_format(packed=True)
+        return entry
+
+    def generate_packed_batch_jsonl(
+        self,
+        reviews: List[Tuple[str, str]],
+        output_dir: str,
+        max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        max_requests: int = MAX_REQUESTS_PER_BATCH
+    ) -> list:
+        tokens_per_review = COMPACT_TOKENS_PER_REVIEW if COMPACT_OUTPUT else OUTPUT_TOKENS_PER_REVIEW
+        packs = pack_reviews(
+            reviews, MAX_PACK_PROMPT_TOKENS, MAX_PACK_OUTPUT_TOKENS, MODEL_NAME, tokens_per_review=tokens_per_review
+        )
+        self.pack_members.clear()
+        entries = []
+        for pack_index, pack in enumerate(packs):
+            custom_id = f"pack-{pack_index}"
+            self.pack_members[custom_id] = [review_id for review_id, _ in pack]
+            entries.append(self.build_packed_entry(custom_id, pack))
+
         Path(output_dir).mkdir(parents=True, exist_ok=True)
+        with open(Path(output_dir) / "pack_members.json", "w", encoding="utf-8") as file:
+            json.dump(self.pack_members, file)
+        logger.info(f"{len(reviews)} Reviews in {len(packs)} gepackte Anfragen aufgeteilt.")
+        return self.write_token_budget_chunks(entries, output_dir, max_enqueued_tokens, max_file_bytes, max_requests)
+
+    def write_token_budget_chunks(
+        self,
+        entries: Iterable[dict],
+        output_dir: str,
+        max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        max_requests: int = MAX_REQUESTS_PER_BATCH,
+        max_active_batches: int = MAX_ACTIVE_BATCHES
+    ) -> list:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        # Das Enqueued-Token-Limit gilt für alle aktiven Batches zusammen: Chunks auf einen Anteil davon
+        # begrenzen, damit der Orchestrator bis zu max_active_batches Chunks gleichzeitig einreichen kann.
+        # Eine einzelne grössere Anfrage erhält einen eigenen Chunk.
+        token_budget = int(max_enqueued_tokens * TOKEN_SAFETY_MARGIN / max_active_batches)
         chunk_paths = []
-        for chunk_index in range(0, len(df), chunk_size):
-            chunk_df = df.iloc[chunk_index:chunk_index + chunk_size]
-            chunk_file = Path(output_dir) / f"batch_chunk_{chunk_index // chunk_size}.jsonl"
-            with open(chunk_file, "w", encoding="utf-8") as file:
-                for index, row in chunk_df.iterrows():
-                    review = self.truncate_review(str(row.get("review", "")))
-                    if not review.strip() or review.strip().lower() in {"nan", "none"}:
-                        continue
-                    prompt = self.build_prompt(review)
-                    entry = {
-                        "custom_id": str(index),
-                        "method": "POST",
-                        "url": "/v1/chat/completions",
-                        "body": {
-                            "model": MODEL_NAME,
-                            "messages": [
-                                {"role": "system", "content": "Du bist ein hilfsbereiter Assistent."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            "temperature": 0
-                        }
-                    }
-                    file.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            chunk_paths.append(str(chunk_file))
-
-        logger.info(f"{len(chunk_paths)} Batch-Dateien wurden erstellt.")
+        self.chunk_tokens.clear()
+        file = None
+        chunk_tokens = chunk_bytes = chunk_requests = 0
+
+        for entry in entries:
+            entry_tokens = self.estimate_entry_tokens(entry)
+            line = dumps_line(entry)
+
+            # Neuen Chunk beginnen, sobald eine der Limiten überschritten würde
+            if file is None or (
+                chunk_tokens + entry_tokens > token_budget
+                or chunk_bytes + len(line) > max_file_bytes
+                or chunk_requests + 1 > max_requests
+            ):
+                if file is not None:
+                    file.close()
+                    self.chunk_tokens[chunk_paths[-1]] = chunk_tokens
+                chunk_file = Path(output_dir) / f"batch_chunk_{len(chunk_paths)}.jsonl"
+                file = open(chunk_file, "wb")
+                chunk_paths.append(str(chunk_file))
+                chunk_tokens = chunk_bytes = chunk_requests = 0
+
+            file.write(line)
+            chunk_tokens += entry_tokens
+            chunk_bytes += len(line)
+            chunk_requests += 1
+
+        if file is not None:
+            file.close()
+            self.chunk_tokens[chunk_paths[-1]] = chunk_tokens
+
+        logger.info(f"{len(chunk_paths)} Batch-Dateien mit max. {token_budget} Tokens pro Batch wurden erstellt.")
         return chunk_paths
 
 class OpenAIBatchRunner:
@@ -71,6 +213,7 @@ class OpenAIBatchRunner:
         if not api_key:
             raise ValueError("API key not found. Please set the OPENAI_API_KEY environment variable.")
         self.client = OpenAI(api_key=api_key)
+        self.metrics = MetricsRecorder(MODEL_NAME)
 
     def run_batch_job(self, jsonl_path: str) -> List[str]:
         uploaded_file = self.upload_batch_file(jsonl_path)
@@ -96,16 +239,32 @@ class OpenAIBatchRunner:
     def wait_for_completion(self, batch_id: str):
         while True:
             batch_job = self.client.batches.retrieve(batch_id)
-            logger.info(f"Aktueller Status: {batch_job.status}")
+            counts = batch_job.request_counts
+            progress = f" ({counts.completed}/{counts.total} Anfragen, {counts.failed} fehlgeschlagen)" if counts else ""
+            logger.info(f"Aktueller Status: {batch_job.status}{progress}")
             logger.info(f"Aktueller Status: {batch_job.errors}")
             if batch_job.status == "completed":
                 logger.info(f"Batch {batch_id} abgeschlossen.")
+                self.record_batch_metrics(batch_job)
                 break
+            if batch_job.status in {"failed", "expired", "cancelled"}:
+                self.record_batch_metrics(batch_job)
+                raise RuntimeError(f"Batch {batch_id} beendet mit Status {batch_job.status}: {batch_job.errors}")
             time.sleep(10)
 
+    def record_batch_metrics(self, batch_job) -> None:
+        # Latenz von der Einreichung bis zum Abschluss des Batches
+        finished_at = batch_job.completed_at or batch_job.failed_at or batch_job.expired_at or batch_job.cancelled_at
+        latency = finished_at - batch_job.created_at if finished_at else None
+        total = batch_job.request_counts.total if batch_job.request_counts else 0
+        self.metrics.record_batch(batch_job.id, batch_job.status, latency, total)
+
     def download_results(self, batch_id: str) -> List[str]:
         batch_job = self.client.batches.retrieve(batch_id)
-        result_file = self.client.files.content(batch_job.output_file_id).content
+        return self.download_file_lines(batch_job.output_file_id)
+
+    def download_file_lines(self, file_id: str) -> List[str]:
+        result_file = self.client.files.content(file_id).content
         return result_file.decode("utf-8").strip().split("\n")
 
     def parse_results(self, result_entries: List[str]) -> pd.DataFrame:
@@ -113,43 +272,178 @@ class OpenAIBatchRunner:
         for entry in result_entries:
             try:
                 item = json.loads(entry)
+                self.metrics.record_usage(item["response"]["body"].get("usage"), batch=True)
                 content = item["response"]["body"]["choices"][0]["message"]["content"]
                 results.append(json.loads(content))
             except Exception as e:
                 logger.warning(f"Fehler beim Parsen eines Eintrags: {e}")
+                self.metrics.record_parse_failure()
+                self.metrics.record_fallback()
                 results.append(DEFAULT_RESULT)
         return pd.DataFrame(results)
 
+    def parse_results_by_id(self, result_entries: List[str]) -> Dict[str, Dict[str, str]]:
+        results = {}
+        for entry in result_entries:
+            try:
+                item = json.loads(entry)
+                self.metrics.record_usage(item["response"]["body"].get("usage"), batch=True)
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+                results[item["custom_id"]] = json.loads(content)
+            except Exception as e:
+                logger.warning(f"Fehler beim Parsen eines Eintrags: {e}")
+                self.metrics.record_parse_failure()
+        return results
+
+    def parse_packed_results(self, result_entries: List[str], pack_members: Dict[str, List[str]]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+        results = {}
+        for entry in result_entries:
+            try:
+                item = json.loads(entry)
+                custom_id = item["custom_id"]
+                self.metrics.record_usage(item["response"]["body"].get("usage"), batch=True)
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+            except Exception as e:
+                logger.warning(f"Fehler beim Parsen eines Eintrags: {e}")
+                self.metrics.record_parse_failure()
+                continue
+            pack_results, missing_ids = parse_packed_response(content, pack_members.get(custom_id, []))
+            if not pack_results:
+                self.metrics.record_parse_failure()
+            if missing_ids:
+                logger.warning(f"{len(missing_ids)} Reviews fehlen in der Antwort zu {custom_id}.")
+            results.update(pack_results)
+
+        missing_ids = [
+            review_id
+            for custom_id, review_ids in pack_members.items()
+            for review_id in review_ids
+            if review_id not in results
+        ]
+        return results, missing_ids
+
+    def parse_compact_results_by_id(
+        self,
+        result_entries: List[str],
+        pack_members: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, Dict[str, str]]:
+        # Alle Zeilen in einem Durchgang in kategorische Spalten dekodieren
+        result_df = parse_compact_results(result_entries, packed=pack_members is not None)
+        for prompt_tokens, completion_tokens in extract_usage(result_entries).itertuples(index=False):
+            self.metrics.record_request(prompt_tokens, completion_tokens, batch=True)
+        if pack_members is not None:
+            # Nur angefragte IDs übernehmen; fehlende gehen in den nächsten Durchgang
+            expected = pd.Index([review_id for review_ids in pack_members.values() for review_id in review_ids])
+            result_df = result_df[result_df.index.isin(expected)]
+            failures = len(expected) - len(result_df)
+        else:
+            failures = len(result_entries) - len(result_df)
+        if failures:
+            logger.warning(f"{failures} Ergebnisse ohne gültige kompakte Antwort.")
+            self.metrics.record_parse_failure(failures)
+        return result_df.astype(str).to_dict("index")
+
+def work_dir_for(texts: List[str]) -> str:
+    # Eigenes Verzeichnis pro Textmenge: parallele Aufrufe überschreiben sich nicht, ein Neustart findet seinen Zustand wieder
+    digest = hashlib.sha256("\x1f".join(texts).encode("utf-8")).hexdigest()[:16]
+    return str(Path(WORK_DIR) / f"chunk_{digest}")
+
+def run_chunks(
+    builder: BatchJsonBuilder,
+    runner: OpenAIBatchRunner,
+    chunk_paths: List[str],
+    work_dir: str = WORK_DIR,
+    max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS
+) -> Dict[str, List[str]]:
+    # Alle Chunks parallel einreichen; der Zustand erlaubt die Wiederaufnahme nach einem Absturz
+    orchestrator = BatchOrchestrator(
+        runner,
+        str(Path(work_dir) / STATE_FILE_NAME),
+        max_active_batches=MAX_ACTIVE_BATCHES,
+        max_enqueued_tokens=max_enqueued_tokens,
+        chunk_tokens=builder.chunk_tokens
+    )
+    return orchestrator.run(chunk_paths)
+
+def classify_packed(
+    builder: BatchJsonBuilder,
+    runner: OpenAIBatchRunner,
+    reviews: List[Tuple[str, str]],
+    work_dir: str = WORK_DIR,
+    max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS
+) -> Dict[str, Dict[str, str]]:
+    review_texts = dict(reviews)
+    results = {}
+    pending = reviews
+    for attempt in range(MAX_PACK_RETRIES + 1):
+        if not pending:
+            break
+        # Fehlende Reviews werden in einem eigenen Durchgang erneut gesendet
+        chunk_paths = builder.generate_packed_batch_jsonl(
+            pending, output_dir=str(Path(work_dir) / f"round_{attempt}"), max_enqueued_tokens=max_enqueued_tokens
+        )
+        chunk_results = run_chunks(builder, runner, chunk_paths, work_dir, max_enqueued_tokens)
+        result_entries = [entry for entries in chunk_results.values() for entry in entries]
+        if COMPACT_OUTPUT:
+            round_results = runner.parse_compact_results_by_id(result_entries, builder.pack_members)
+            missing_ids = [
+                review_id for review_ids in builder.pack_members.values() for review_id in review_ids if review_id not in round_results
+            ]
+        else:
+            round_results, missing_ids = runner.parse_packed_results(result_entries, builder.pack_members)
+        results.update(round_results)
+        pending = [(review_id, review_texts[review_id]) for review_id in missing_ids]
+    if pending:
+        logger.warning(f"{len(pending)} Reviews ohne Ergebnis, verwende Standardergebnis.")
+    return results
+
+def classify_texts(
+    builder: BatchJsonBuilder,
+    runner: OpenAIBatchRunner,
+    texts: List[str],
+    work_dir: str = WORK_DIR,
+    max_enqueued_tokens: int = MAX_ENQUEUED_TOKENS
+) -> List[Dict[str, str]]:
+    # Batch-Dateien und Orchestrator-Zustand liegen unter work_dir; parallele Aufrufe brauchen je ein eigenes
+    reviews = [(str(position), text) for position, text in enumerate(texts)]
+    if PACKED_MODE:
+        results = classify_packed(builder, runner, reviews, work_dir, max_enqueued_tokens)
+    else:
+        chunk_paths = builder.generate_batch_jsonl_with_token_budget(reviews, output_dir=work_dir, max_enqueued_tokens=max_enqueued_tokens)
+        chunk_results = run_chunks(builder, runner, chunk_paths, work_dir, max_enqueued_tokens)
+        result_entries = [entry for entries in chunk_results.values() for entry in entries]
+        if COMPACT_OUTPUT:
+            results = runner.parse_compact_results_by_id(result_entries)
+        else:
+            results = runner.parse_results_by_id(result_entries)
+    runner.metrics.record_fallback(sum(review_id not in results for review_id, _ in reviews))
+    return [results.get(review_id, DEFAULT_RESULT) for review_id, _ in reviews]
+
 def main():
     api_key = os.getenv("OPENAI_API_KEY")
-    builder = BatchJsonBuilder()
     runner = OpenAIBatchRunner(api_key)
 
-    # Chunks erzeugen
-    chunk_paths = builder.generate_batch_jsonl_with_chunking(INPUT_FILE, output_dir="batches", chunk_size=50)
-
-    all_results = []
-
-    # Chunk einzeln verarbeiten
-    for i, chunk_path in enumerate(chunk_paths):
-        logger.info(f"Starte Verarbeitung für {chunk_path} ({i+1}/{len(chunk_paths)})")
-
-        try:
-            result_entries = runner.run_batch_job(chunk_path)
-            result_df = runner.parse_results(result_entries)
-            all_results.append(result_df)
-        except Exception as e:
-            logger.error(f"Fehler beim Verarbeiten von {chunk_path}: {e}")
-
-    # Ergebnisse zusammenführen
-    if all_results:
-        final_results = pd.concat(all_results, ignore_index=True)
-        input_df = pd.read_csv(INPUT_FILE)
-        input_df.insert(3, "food_rating", final_results["food"])
-        input_df.insert(4, "service_rating", final_results["service"])
-        input_df.insert(5, "atmosphere_rating", final_results["atmosphere"])
-        input_df.to_csv(OUTPUT_FILE, index=False)
-        logger.info("Klassifizierte Reviews gespeichert in classified_reviews.csv.")
+    # Gleiche Reviews nur einmal klassifizieren, bekannte Ergebnisse aus dem Cache lesen
+    if PACKED_MODE:
+        prompt_template = (build_compact_packed_prompt if COMPACT_OUTPUT else build_packed_prompt)([("{id}", "{review}")])
+    else:
+        prompt_template = build_compact_prompt("{review}") if COMPACT_OUTPUT else build_prompt("{review}")
+    cache = ClassificationCache(CACHE_FILE, prompt_template, MODEL_NAME)
+
+    def classify_chunk(texts: List[str]) -> List[Dict[str, str]]:
+        # Eigener Builder und eigenes Verzeichnis pro Chunk, ein Neustart setzt beim offenen Chunk fort
+        return classify_texts(BatchJsonBuilder(), runner, texts, work_dir_for(texts))
+
+    # Die Eingabe wird chunkweise gelesen, klassifiziert und geschrieben; leere Reviews erhalten das Standardergebnis
+    try:
+        rows = write_classified_csv(
+            INPUT_FILE, OUTPUT_FILE, lambda texts: classify_with_cache(texts, cache, classify_chunk, fallback=DEFAULT_RESULT)
+        )
+    finally:
+        cache.close()
+    runner.metrics.record_reviews(rows)
+    runner.metrics.export(METRICS_JSON, METRICS_PROMETHEUS)
+    logger.info("Klassifizierte Reviews gespeichert in classified_reviews.csv.")
 
 if __name__ == "__main__":
     main()
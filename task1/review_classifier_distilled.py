@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import logging
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from joblib import Parallel, delayed
+from scipy.sparse import hstack, vstack
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, cohen_kappa_score, confusion_matrix, f1_score
+from sklearn.model_selection import train_test_split
+from review_common import RATING_COLUMNS, empty_reviews, insert_rating_columns
+from streaming_io import READ_CHUNK_SIZE, ChunkWriter
+
+INPUT_FILE = "task_1_google_maps_comments.csv"
+OUTPUT_FILE = "classified_reviews_distilled.csv"
+# Von einem LLM-Lauf klassifizierte Reviews dienen als Trainingsdaten
+LABELS_FILE = "classified_reviews.csv"
+MODEL_FILE = "distilled_model.joblib"
+REPORT_FILE = "distilled_agreement.json"
+
+LABELS = ["positiv", "neutral", "negativ", "None"]
+LABEL_DTYPE = pd.CategoricalDtype(LABELS)
+# Schreibweisen der verschiedenen Prompts und Skripte vereinheitlichen
+LABEL_ALIASES = {
+    "positiv": "positiv", "positive": "positiv", "p": "positiv",
+    "neutral": "neutral", "0": "neutral",
+    "negativ": "negativ", "negative": "negativ", "n": "negativ",
+    "none": "None", "-": "None", "nan": "None", "": "None",
+}
+
+# Hashing braucht kein Vokabular und bleibt bei jeder Datenmenge gleich gross
+WORD_FEATURES = 2 ** 20
+# Das Zeichen-Hashing bestimmt die Inferenzzeit: mit char_wb 3-5 und 2^20 Merkmalen waren es rund
+# 2k Reviews/s (1 Kern, ~200 Zeichen pro Review), nur 4-Gramme mit 2^18 Merkmalen schaffen rund 4k/s,
+# bei kurzen Reviews rund 10k/s. Zehntausende pro Sekunde gibt es nur mit mehreren Kernen (HASH_JOBS);
+# der gemessene Wert steht im Übereinstimmungsbericht (inference_reviews_per_second)
+CHAR_FEATURES = 2 ** 18
+CHAR_NGRAM_RANGE = (4, 4)
+# Bestandteile, die save() schreibt und load() wieder einsetzt
+MODEL_COMPONENTS = ("word_vectorizer", "char_vectorizer", "tfidf", "heads", "constant_labels")
+# Das Hashing grosser Eingaben wird auf Prozesse verteilt; kleine Chunks (z.B. aus review_pipeline) bleiben im Prozess
+HASH_JOBS = os.cpu_count() or 1
+PARALLEL_MIN_TEXTS = 20_000
+TEST_SIZE = 0.2
+MIN_TRAINING_REVIEWS = 500
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def normalize_labels(labels: pd.Series) -> pd.Series:
+    normalized = labels.astype(str).str.strip().str.lower().map(LABEL_ALIASES)
+    unknown = normalized.isna().sum()
+    if unknown:
+        logger.warning(f"{unknown} unbekannte Labels werden als None behandelt.")
+    return normalized.fillna("None").astype(LABEL_DTYPE)
+
+
+def load_training_data(csv_path: str) -> pd.DataFrame:
+    df = pd.read_csv(csv_path, usecols=["review", *RATING_COLUMNS.values()], dtype=str, keep_default_na=False)
+    df = df[~df["review"].str.strip().str.lower().isin(["", "nan", "none"])]
+    data = pd.DataFrame({"review": df["review"].str.strip()})
+    for category, column in RATING_COLUMNS.items():
+        data[category] = df[column]
+    return data.reset_index(drop=True)
+
+
+def hash_texts(word_vectorizer: HashingVectorizer, char_vectorizer: HashingVectorizer, texts: List[str]):
+    return hstack([word_vectorizer.transform(texts), char_vectorizer.transform(texts)]).tocsr()
+
+
+class DistilledClassifier:
+    def __init__(self, n_jobs: int = HASH_JOBS):
+        self.n_jobs = n_jobs
+        # Wort-Uni-/Bigramme plus Zeichen-n-Gramme, die auch Komposita und Tippfehler abdecken
+        self.word_vectorizer = HashingVectorizer(
+            n_features=WORD_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm=None, lowercase=True
+        )
+        self.char_vectorizer = HashingVectorizer(
+            n_features=CHAR_FEATURES, analyzer="char_wb", ngram_range=CHAR_NGRAM_RANGE, alternate_sign=False, norm=None, lowercase=True
+        )
+        self.tfidf = TfidfTransformer(sublinear_tf=True)
+        # Ein Kopf pro Aspekt; ein Aspekt mit nur einem Label im Training bleibt konstant
+        self.heads: Dict[str, LogisticRegression] = {}
+        self.constant_labels: Dict[str, str] = {}
+
+    def _hash(self, texts: List[str]):
+        if self.n_jobs <= 1 or len(texts) < PARALLEL_MIN_TEXTS:
+            return hash_texts(self.word_vectorizer, self.char_vectorizer, texts)
+        # Die Vectorizer sind zustandslos und klein, nur sie und die Texte gehen an die Prozesse
+        size = -(-len(texts) // self.n_jobs)
+        parts = Parallel(n_jobs=self.n_jobs)(
+            delayed(hash_texts)(self.word_vectorizer, self.char_vectorizer, texts[start:start + size])
+            for start in range(0, len(texts), size)
+        )
+        return vstack(parts).tocsr()
+
+    def fit(self, texts: List[str], labels: pd.DataFrame) -> "DistilledClassifier":
+        # labels: eine Spalte pro Aspekt, z.B. das DataFrame aus OpenAIBatchRunner.parse_results
+        features = self.tfidf.fit_transform(self._hash(texts))
+        self.heads.clear()
+        self.constant_labels.clear()
+        for category in RATING_COLUMNS:
+            targets = normalize_labels(labels[category]).astype(str).to_numpy()
+            if len(np.unique(targets)) < 2:
+                self.constant_labels[category] = targets[0]
+                logger.warning(f"Nur ein Label für {category} in den Trainingsdaten, der Kopf bleibt konstant.")
+                continue
+            head = LogisticRegression(max_iter=1000, class_weight="balanced")
+            self.heads[category] = head.fit(features, targets)
+            logger.info(f"Kopf für {category} trainiert ({len(head.classes_)} Klassen).")
+        return self
+
+    def predict(self, texts: List[str]) -> pd.DataFrame:
+        # Merkmale einmal berechnen; jeder Kopf ist dann ein einziges Sparse-Matrix-Produkt
+        features = self.tfidf.transform(self._hash(texts))
+        predictions = {}
+        for category in RATING_COLUMNS:
+            if category in self.heads:
+                head = self.heads[category]
+                scores = features @ head.coef_.T + head.intercept_
+                if scores.shape[1] == 1:
+                    indices = (np.asarray(scores).ravel() > 0).astype(int)
+                else:
+                    indices = np.asarray(scores).argmax(axis=1)
+                predictions[category] = pd.Categorical(head.classes_[indices], dtype=LABEL_DTYPE)
+            else:
+                predictions[category] = pd.Categorical([self.constant_labels[category]] * len(texts), dtype=LABEL_DTYPE)
+        return pd.DataFrame(predictions)
+
+    def save(self, path: str) -> None:
+        # Nur die trainierten sklearn-Bestandteile speichern: ein gepickeltes DistilledClassifier-Objekt
+        # verweist beim Training über die CLI auf __main__ und lässt sich aus anderen Modulen nicht laden
+        components = {name: getattr(self, name) for name in MODEL_COMPONENTS}
+        joblib.dump(components, path, compress=3)
+        logger.info(f"Modell gespeichert in {path}.")
+
+    @staticmethod
+    def load(path: str, n_jobs: int = HASH_JOBS) -> "DistilledClassifier":
+        components = joblib.load(path)
+        model = DistilledClassifier(n_jobs)
+        for name in MODEL_COMPONENTS:
+            setattr(model, name, components[name])
+        return model
+
+
+def agreement_report(labels: pd.DataFrame, predictions: pd.DataFrame) -> dict:
+    report = {}
+    matches = np.ones(len(labels), dtype=bool)
+    for category in RATING_COLUMNS:
+        expected = normalize_labels(labels[category]).astype(str).to_numpy()
+        predicted = predictions[category].astype(str).to_numpy()
+        matches &= expected == predicted
+        report[category] = {
+            "accuracy": accuracy_score(expected, predicted),
+            "macro_f1": f1_score(expected, predicted, labels=LABELS, average="macro", zero_division=0),
+            "cohen_kappa": cohen_kappa_score(expected, predicted, labels=LABELS),
+            "labels": LABELS,
+            "confusion_matrix": confusion_matrix(expected, predicted, labels=LABELS).tolist()
+        }
+    # Anteil Reviews, bei denen alle drei Aspekte mit dem LLM übereinstimmen
+    report["exact_match"] = float(matches.mean()) if len(matches) else 0.0
+    return report
+
+
+def train(labels_file: str, model_file: str, report_file: str, test_size: float = TEST_SIZE) -> dict:
+    data = load_training_data(labels_file)
+    if len(data) < MIN_TRAINING_REVIEWS:
+        logger.warning(f"Nur {len(data)} gelabelte Reviews, die Übereinstimmung ist wenig aussagekräftig.")
+    train_data, test_data = train_test_split(data, test_size=test_size, random_state=42)
+
+    # Übereinstimmung auf zurückgehaltenen Reviews messen, danach auf allen Daten neu trainieren
+    model = DistilledClassifier().fit(train_data["review"].tolist(), train_data)
+    start = time.perf_counter()
+    predictions = model.predict(test_data["review"].tolist())
+    elapsed = time.perf_counter() - start
+    report = agreement_report(test_data.reset_index(drop=True), predictions)
+    # Gemessener Durchsatz der Inferenz (Hashing dominiert), damit der Abstand zum Ziel sichtbar bleibt
+    report.update({
+        "training_reviews": len(train_data),
+        "test_reviews": len(test_data),
+        "inference_reviews_per_second": round(len(test_data) / elapsed) if elapsed else None,
+        "hash_jobs": model.n_jobs if len(test_data) >= PARALLEL_MIN_TEXTS else 1
+    })
+    logger.info(f"Inferenz auf den Testdaten: {report['inference_reviews_per_second']} Reviews/s.")
+    for category in RATING_COLUMNS:
+        logger.info(f"Übereinstimmung mit dem LLM für {category}: {report[category]['accuracy']:.1%} (Macro-F1 {report[category]['macro_f1']:.3f})")
+
+    model = DistilledClassifier().fit(data["review"].tolist(), data)
+    model.save(model_file)
+    with open(report_file, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+def classify_csv(model: DistilledClassifier, input_file: str, output_file: str, chunksize: int = READ_CHUNK_SIZE) -> int:
+    rows = 0
+    start = time.perf_counter()
+    with ChunkWriter(output_file) as writer:
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            reviews = chunk["review"].fillna("").astype(str)
+            predictions = model.predict(reviews.tolist())
+            predictions.index = chunk.index
+            # Leere Reviews wie in den anderen Skripten mit None markieren
+            predictions.loc[empty_reviews(chunk["review"])] = "None"
+            writer.write(insert_rating_columns(chunk, predictions))
+            rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{rows} Reviews in {elapsed:.1f}s klassifiziert ({rows / elapsed if elapsed else 0:.0f} Reviews/s).")
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Lokales Modell auf LLM-Labels trainieren und Reviews damit klassifizieren.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train")
+    train_parser.add_argument("--labels", default=LABELS_FILE)
+    train_parser.add_argument("--model", default=MODEL_FILE)
+    train_parser.add_argument("--report", default=REPORT_FILE)
+    classify_parser = subparsers.add_parser("classify")
+    classify_parser.add_argument("--input", default=INPUT_FILE)
+    classify_parser.add_argument("--output", default=OUTPUT_FILE)
+    classify_parser.add_argument("--model", default=MODEL_FILE)
+    classify_parser.add_argument("--jobs", type=int, default=HASH_JOBS, help="Prozesse für das Hashing grosser Chunks")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        train(args.labels, args.model, args.report)
+    else:
+        classify_csv(DistilledClassifier.load(args.model, args.jobs), args.input, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,64 @@
+import os
 import pandas as pd
 import spacy
 import nltk
+from multiprocessing import Pool
+from typing import Dict, List, Set, Tuple
 from nltk.sentiment import SentimentIntensityAnalyzer
+from keyword_matcher import KeywordMatcher, load_keywords
+from review_common import RATING_COLUMNS, empty_reviews, insert_rating_columns
+from streaming_io import ChunkWriter
 
-# Download Ressourcen für nltk
-nltk.download('vader_lexicon')
-sia = SentimentIntensityAnalyzer()
+# Einstellungen für den Batch-Modus
+BATCH_SIZE = 1000
+N_PROCESS = os.cpu_count() or 1
+# Für die Satzgrenzen reicht der regelbasierte Sentencizer, das volle Modell ist deutlich langsamer
+USE_SENTENCIZER = True
+# Vom Modell werden nur Satzgrenzen benötigt (Parser + tok2vec)
+UNUSED_COMPONENTS = ["tagger", "morphologizer", "attribute_ruler", "lemmatizer", "ner"]
 
-# Spacy Modell für Deutsch laden
-try:
-    nlp = spacy.load("de_core_web_sm")
-except:
-    from spacy.cli import download
-    download("de_core_web_sm")
-    nlp = spacy.load("de_core_web_sm")
-
-# Schlüsselwörter pro Kategorie
+# Schlüsselwörter pro Kategorie ("*" erlaubt Komposita bzw. Fortsetzungen, "[...]" die erlaubten Endungen,
+# siehe keyword_matcher.py)
 keywords = {
-    "food": ["essen", "food", "gericht", "speise", "menu"],
-    "service": ["service", "bedienung", "kellner", "personal"],
-    "atmosphere": ["atmosphäre", "ambiente", "musik", "einrichtung"]
+    "food": ["essen[s]", "food", "*gericht[e,en,es,s]", "speise*", "menu", "menü[s]"],
+    "service": ["service", "bedienung[en]", "kellner[in,innen,n,s]", "*personal[s]"],
+    "atmosphere": ["atmosphäre", "ambiente", "musik", "einrichtung[en]"]
 }
+# Optional eigenes Wörterbuch als JSON-Datei ({"food": [...], ...})
+KEYWORDS_FILE = None
+if KEYWORDS_FILE:
+    keywords = load_keywords(KEYWORDS_FILE)
+matcher = KeywordMatcher(keywords)
 
-def classify_sentiment(text):
-    sentiment_score = sia.polarity_scores(text)["compound"]
+# Modelle werden erst bei der ersten Verwendung geladen bzw. einmal pro Pool-Prozess in _init_worker,
+# damit der Import (auch in jedem Worker) kein Modell lädt und nichts herunterlädt
+_sia = None
+_nlp = None
+_worker_nlp = None
+
+def get_sia() -> SentimentIntensityAnalyzer:
+    global _sia
+    if _sia is None:
+        try:
+            nltk.data.find("sentiment/vader_lexicon.zip")
+        except LookupError:
+            nltk.download("vader_lexicon")
+        _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+def get_nlp():
+    # Spacy Modell für Deutsch laden
+    global _nlp
+    if _nlp is None:
+        try:
+            _nlp = spacy.load("de_core_web_sm")
+        except OSError:
+            from spacy.cli import download
+            download("de_core_web_sm")
+            _nlp = spacy.load("de_core_web_sm")
+    return _nlp
+
+def label_from_score(sentiment_score):
     if sentiment_score >= 0.1:
         return "positive"
     elif sentiment_score <= -0.1:
@@ -33,29 +68,99 @@ def classify_sentiment(text):
     else:
         return "None"
 
-def classify_review(review):
-    review_preprocessed = nlp(review.lower())
+def classify_sentiment(text):
+    return label_from_score(get_sia().polarity_scores(text)["compound"])
+
+def matched_sentences(doc) -> List[Tuple[str, Set[str]]]:
+    # Ein Durchlauf des Matchers pro Review, Treffer werden den Sätzen zugeordnet
+    sents = list(doc.sents)
+    hits = matcher.categories_by_sentence(doc.text, [sent.start_char for sent in sents])
+    return [(sents[position].text, categories) for position, categories in sorted(hits.items())]
+
+def classify_analyzed(analyzed: List[Tuple[str, Set[str], float]]) -> Dict[str, str]:
     result = {"food": "None", "service": "None", "atmosphere": "None"}
-    for sent in review_preprocessed.sents:
-        sent_text = sent.text
-        for category, word_list in keywords.items():
-            if any(word in sent_text for word in word_list):
-                sentiment = classify_sentiment(sent_text)
-                result[category] = sentiment
+    for _, categories, score in analyzed:
+        sentiment = label_from_score(score)
+        for category in categories:
+            result[category] = sentiment
     return result
 
-# CSV einlesen
-df = pd.read_csv("task_1_google_maps_comments.csv")
+def classify_doc(doc) -> Dict[str, str]:
+    analyzed = [
+        (sent_text, categories, get_sia().polarity_scores(sent_text)["compound"])
+        for sent_text, categories in matched_sentences(doc)
+    ]
+    return classify_analyzed(analyzed)
+
+def classify_review(review):
+    review_preprocessed = get_nlp()(review.lower())
+    return classify_doc(review_preprocessed)
+
+def load_fast_pipeline():
+    if USE_SENTENCIZER:
+        fast_nlp = spacy.blank("de")
+        fast_nlp.add_pipe("sentencizer")
+        return fast_nlp
+    return spacy.load("de_core_web_sm", exclude=UNUSED_COMPONENTS)
+
+def _init_worker():
+    global _worker_nlp
+    if _worker_nlp is None:
+        _worker_nlp = load_fast_pipeline()
+    get_sia()
+
+def analyze_batch(reviews: List[str]) -> List[List[Tuple[str, Set[str], float]]]:
+    _init_worker()
+    sia = get_sia()
+    docs = list(_worker_nlp.pipe((review.lower() for review in reviews), batch_size=len(reviews)))
+    matches = [matched_sentences(doc) for doc in docs]
+    # VADER einmal pro Batch über alle relevanten, eindeutigen Sätze laufen lassen
+    sentences = {sent_text for doc_matches in matches for sent_text, _ in doc_matches}
+    scores = {sentence: sia.polarity_scores(sentence)["compound"] for sentence in sentences}
+    return [
+        [(sent_text, categories, scores[sent_text]) for sent_text, categories in doc_matches]
+        for doc_matches in matches
+    ]
+
+def classify_batch(reviews: List[str]) -> List[Dict[str, str]]:
+    return [classify_analyzed(analyzed) for analyzed in analyze_batch(reviews)]
+
+def _run_batches(func, reviews: List[str], batch_size: int, n_process: int) -> list:
+    batches = [reviews[start:start + batch_size] for start in range(0, len(reviews), batch_size)]
+    if n_process <= 1:
+        _init_worker()
+        batch_results = map(func, batches)
+        return [result for results in batch_results for result in results]
+    # imap liefert die Batches in der ursprünglichen Reihenfolge zurück
+    with Pool(processes=n_process, initializer=_init_worker) as pool:
+        return [result for results in pool.imap(func, batches) for result in results]
+
+def classify_reviews_batched(reviews: List[str], batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS) -> List[Dict[str, str]]:
+    return _run_batches(classify_batch, reviews, batch_size, n_process)
+
+def analyze_reviews_batched(reviews: List[str], batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS) -> List[List[Tuple[str, Set[str], float]]]:
+    # Wie classify_reviews_batched, liefert aber pro Review die Treffer-Sätze mit VADER-Score
+    return _run_batches(analyze_batch, reviews, batch_size, n_process)
+
+def main():
+    # CSV einlesen
+    df = pd.read_csv("task_1_google_maps_comments.csv")
+
+    # Klassifikation anwenden
+    # Fehlende Reviews sind NaN (float) und erhalten ohne Analyse "None"
+    empty = empty_reviews(df['review'])
+    reviews = df.loc[~empty, 'review'].astype(str)
+    results = classify_reviews_batched(reviews.tolist())
+    classified = pd.DataFrame(results, index=reviews.index).reindex(index=df.index, columns=list(RATING_COLUMNS))
 
-# Klassifikation anwenden
-classified = df['review'].apply(lambda x: pd.Series(classify_review(str(x))))
+    # Neue Spalten an bestimmten Index-Positionen einfügen
+    insert_rating_columns(df, classified)
 
-# Neue Spalten an bestimmten Index-Positionen einfügen
-df.insert(3, "food_rating", classified["food"])
-df.insert(4, "service_rating", classified["service"])
-df.insert(5, "atmosphere_rating", classified["atmosphere"])
+    # Ergebnis speichern
+    with ChunkWriter("classified_reviews.csv") as writer:
+        writer.write(df)
 
-# Ergebnis speichern
-df.to_csv("classified_reviews.csv", index=False)
+    print("Klassifikation abgeschlossen. Ergebnis in 'classified_reviews.csv' gespeichert.")
 
-print("Klassifikation abgeschlossen. Ergebnis in 'classified_reviews.csv' gespeichert.")
+if __name__ == "__main__":
+    main()
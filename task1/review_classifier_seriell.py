@@ -1,51 +1,234 @@
 import os
 import json
 import time
+import random
+import asyncio
 import pandas as pd
 import logging
-from openai import OpenAI
-from typing import Dict
+from openai import OpenAI, AsyncOpenAI, APIError, RateLimitError, APIConnectionError, InternalServerError
+from typing import Dict, List, Optional, Tuple
+from checkpoint_store import CHECKPOINT_FILE, CheckpointStore, content_hash, load_previous_results, review_keys
+from classification_cache import CACHE_FILE, ClassificationCache, classify_with_cache
+from compact_output import (
+    COMPACT_MAX_TOKENS, COMPACT_TOKENS_PER_REVIEW, build_compact_packed_prompt, build_compact_prompt,
+    parse_compact_packed_response, parse_compact_response, responses_text_format
+)
+from metrics import MetricsRecorder
+from rate_limiter import RateLimiter
+from review_common import DEFAULT_RESULT, build_prompt, empty_reviews, insert_rating_columns
+from review_packing import OUTPUT_TOKENS_PER_REVIEW, build_packed_prompt, pack_reviews, packed_output_tokens, parse_packed_response
+from streaming_io import ChunkWriter
+from tokens import estimate_tokens
 
-MODEL_NAME = "gpt-4"
-DEFAULT_RESULT = {"food": "None", "service": "None", "atmosphere": "None"}
+# Kompakte Antworten (p/n/0/-) mit JSON-Schema; Structured Outputs benötigen ein gpt-4o-Modell
+COMPACT_OUTPUT = True
+MODEL_NAME = "gpt-4o-mini" if COMPACT_OUTPUT else "gpt-4"
 INPUT_FILE = "task_1_google_maps_comments.csv"
+OUTPUT_FILE = "classified_reviews.csv"
+
+# Zwischenstände nach jeweils so vielen Reviews sichern
+CHECKPOINT_INTERVAL = 500
+# Inkrementeller Modus: nur neue oder geänderte Reviews gegenüber dem letzten Ergebnis klassifizieren
+INCREMENTAL = True
+PREVIOUS_OUTPUT_FILE = OUTPUT_FILE
+# Spalten, die ein Review eindeutig identifizieren (None: review_id oder alle Spalten ausser dem Text)
+REVIEW_KEY_COLUMNS: Optional[List[str]] = None
+
+# Einstellungen für den asynchronen Modus
+USE_ASYNC = True
+CONCURRENCY = 20
+# Limiten von gpt-4o-mini ab Usage-Tier 2; bei anderen Konten gemäss Rate-Limit-Seite anpassen
+REQUESTS_PER_MINUTE = 5_000
+TOKENS_PER_MINUTE = 2_000_000
+EXPECTED_OUTPUT_TOKENS = COMPACT_MAX_TOKENS if COMPACT_OUTPUT else 50
+MAX_RETRIES = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+# Mehrere Reviews pro Anfrage senden (gepackter Modus)
+USE_PACKING = True
+MAX_PACK_PROMPT_TOKENS = 3_000
+MAX_PACK_OUTPUT_TOKENS = 1_000
+MAX_PACK_RETRIES = 2
+
+# Export der Token-, Kosten- und Latenzmetriken
+METRICS_JSON = "metrics_summary.json"
+METRICS_PROMETHEUS = "metrics.prom"
 
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger()
 
 class ReviewClassifier:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        concurrency: int = CONCURRENCY,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+    ):
         if not api_key:
             raise ValueError("API key not found. Please set the OPENAI_API_KEY environment variable.")
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.metrics = MetricsRecorder(MODEL_NAME)
 
     def classify_reviews(self, text: str) -> Dict[str, str]:
-        response = self.client.responses.create(model=MODEL_NAME, input=self.build_prompt(text))
+        start = time.perf_counter()
+        response = self.client.responses.create(model=MODEL_NAME, input=self.build_request_prompt(text), **self.request_options())
+        self.metrics.record_usage(response.usage, time.perf_counter() - start)
         time.sleep(1)
         return self.parse_response(response)
 
-    def build_prompt(self, text: str) -> str:
-        return f"""
-        Du bist ein Analyse-Tool für Google-Bewertungen. 
-        Analysiere den folgenden Kommentar und gib für jede Kategorie (Essen, Service, Atmosphäre) an, ob der Ton positiv, neutral, negativ. Wird die Kategorie nicht erwähnt oder sie ist nicht klassifizierbar soll der Ton None sein.
+    async def classify_reviews_async(self, texts: List[str]) -> List[Dict[str, str]]:
+        # Limiter, Semaphore und die Verbindungen des Clients gehören zum laufenden Event-Loop;
+        # jeder asyncio.run-Aufruf braucht daher einen eigenen Client, der hier auch geschlossen wird
+        rate_limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with AsyncOpenAI(api_key=self.api_key) as client:
+            tasks = [self._classify_review_async(client, text, semaphore, rate_limiter) for text in texts]
+            # gather liefert die Ergebnisse in der Reihenfolge der Eingabe
+            return await asyncio.gather(*tasks)
+
+    async def _classify_review_async(
+        self,
+        client: AsyncOpenAI,
+        text: str,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: RateLimiter
+    ) -> Dict[str, str]:
+        prompt = self.build_request_prompt(text)
+        tokens = estimate_tokens(prompt, MODEL_NAME) + EXPECTED_OUTPUT_TOKENS
+        response = await self._request_with_retry(client, prompt, tokens, semaphore, rate_limiter, **self.request_options())
+        if response is None:
+            logger.error("Keine Antwort erhalten, verwende Standardergebnis.")
+            self.metrics.record_fallback()
+            return DEFAULT_RESULT
+        try:
+            return self.parse_response(response)
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"Antwort konnte nicht geparst werden: {e}")
+            self.metrics.record_parse_failure()
+            self.metrics.record_fallback()
+            return DEFAULT_RESULT
+
+    async def classify_reviews_packed_async(self, texts: List[str]) -> List[Dict[str, str]]:
+        rate_limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: Dict[str, Dict[str, str]] = {}
+        pending = [(str(position), text) for position, text in enumerate(texts)]
+
+        async with AsyncOpenAI(api_key=self.api_key) as client:
+            for attempt in range(MAX_PACK_RETRIES + 1):
+                if not pending:
+                    break
+                packs = pack_reviews(
+                    pending, MAX_PACK_PROMPT_TOKENS, MAX_PACK_OUTPUT_TOKENS, MODEL_NAME,
+                    tokens_per_review=COMPACT_TOKENS_PER_REVIEW if COMPACT_OUTPUT else OUTPUT_TOKENS_PER_REVIEW
+                )
+                logger.info(f"Sende {len(pending)} Reviews in {len(packs)} gepackten Anfragen (Durchgang {attempt + 1}).")
+                tasks = [self._classify_pack_async(client, pack, semaphore, rate_limiter) for pack in packs]
+                pending = []
+                for pack_results, missing_ids in await asyncio.gather(*tasks):
+                    results.update(pack_results)
+                    pending.extend((review_id, texts[int(review_id)]) for review_id in missing_ids)
 
-        Kommentar: "{text}"
+        if pending:
+            logger.warning(f"{len(pending)} Reviews ohne Ergebnis, verwende Standardergebnis.")
+            self.metrics.record_fallback(len(pending))
+        return [results.get(str(position), DEFAULT_RESULT) for position in range(len(texts))]
 
-        Antwortformat (JSON):
-        {{
-        "food": "...",
-        "service": "...",
-        "atmosphere": "..."
-        }}
-        """
+    async def _classify_pack_async(
+        self,
+        client: AsyncOpenAI,
+        pack: List[Tuple[str, str]],
+        semaphore: asyncio.Semaphore,
+        rate_limiter: RateLimiter
+    ) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+        review_ids = [review_id for review_id, _ in pack]
+        if COMPACT_OUTPUT:
+            prompt = build_compact_packed_prompt(pack)
+            output_tokens = packed_output_tokens(len(pack), COMPACT_TOKENS_PER_REVIEW)
+            request_options = {"text": responses_text_format(packed=True)}
+        else:
+            prompt = build_packed_prompt(pack)
+            output_tokens = packed_output_tokens(len(pack))
+            request_options = {}
+        tokens = estimate_tokens(prompt, MODEL_NAME) + output_tokens
+        response = await self._request_with_retry(
+            client, prompt, tokens, semaphore, rate_limiter, max_output_tokens=output_tokens, **request_options
+        )
+        if response is None or not response.output_text:
+            return {}, review_ids
+        if COMPACT_OUTPUT:
+            pack_results, missing_ids = parse_compact_packed_response(response.output_text, review_ids)
+        else:
+            pack_results, missing_ids = parse_packed_response(response.output_text, review_ids)
+        if not pack_results:
+            self.metrics.record_parse_failure()
+        return pack_results, missing_ids
+
+    async def _request_with_retry(
+        self,
+        client: AsyncOpenAI,
+        prompt: str,
+        tokens: int,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: RateLimiter,
+        **request_options
+    ):
+        async with semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                await rate_limiter.acquire(tokens)
+                start = time.perf_counter()
+                try:
+                    response = await client.responses.create(model=MODEL_NAME, input=prompt, **request_options)
+                    self.metrics.record_usage(response.usage, time.perf_counter() - start)
+                    return response
+                except RateLimitError as e:
+                    delay = self._retry_delay(attempt, e.response.headers.get("retry-after"))
+                    logger.warning(f"Rate-Limit erreicht, neuer Versuch in {delay:.1f}s ({attempt + 1}/{MAX_RETRIES}).")
+                    rate_limiter.pause(delay)
+                    await asyncio.sleep(delay)
+                except (APIConnectionError, InternalServerError) as e:
+                    delay = self._retry_delay(attempt)
+                    logger.warning(f"Anfrage fehlgeschlagen ({e}), neuer Versuch in {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                except APIError as e:
+                    # Nicht wiederholbare Fehler (z.B. 400 bei zu langem Kontext) betreffen nur diese Anfrage;
+                    # None löst den Fallback aus, statt gather und damit den ganzen Abschnitt abzubrechen
+                    logger.error(f"Anfrage abgelehnt, kein neuer Versuch: {e}")
+                    return None
+        return None
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def build_request_prompt(self, text: str) -> str:
+        return build_compact_prompt(text) if COMPACT_OUTPUT else build_prompt(text)
+
+    def request_options(self) -> dict:
+        # Das Schema erzwingt die kompakten Codes, die Antwort bleibt unter wenigen Tokens
+        if COMPACT_OUTPUT:
+            return {"text": responses_text_format(), "max_output_tokens": COMPACT_MAX_TOKENS}
+        return {}
 
     def parse_response(self, response) -> Dict[str, str]:
         output_text = response.output_text
         if output_text:
-            return json.loads(output_text)
+            return parse_compact_response(output_text) if COMPACT_OUTPUT else json.loads(output_text)
         else:
             logger.warning("Keine Ausgabe erhalten.")
+            self.metrics.record_fallback()
             return DEFAULT_RESULT
 
 def main():
@@ -54,21 +237,76 @@ def main():
     analyzer = ReviewClassifier(api_key)
 
     # CSV einlesen
-    google_maps_comments = pd.read_csv("test.csv")
+    google_maps_comments = pd.read_csv(INPUT_FILE)
+    # Fehlende Reviews sind NaN (float); sie werden nicht klassifiziert und erhalten "None"
+    empty = empty_reviews(google_maps_comments["review"]).tolist()
+    review_texts = google_maps_comments["review"].astype(object).fillna("").astype(str).tolist()
+
+    # Jedes Review über einen stabilen Schlüssel und den Hash seines Textes identifizieren
+    keys = review_keys(google_maps_comments, REVIEW_KEY_COLUMNS)
+    hashes = [content_hash(text) for text in review_texts]
+    known = load_previous_results(PREVIOUS_OUTPUT_FILE, REVIEW_KEY_COLUMNS) if INCREMENTAL else {}
+    checkpoint = CheckpointStore(CHECKPOINT_FILE)
+    known.update(checkpoint.load())
+    pending = [
+        position for position, (key, hash_value) in enumerate(zip(keys, hashes))
+        if not empty[position] and known.get(key, (None,))[0] != hash_value
+    ]
+    logger.info(f"{len(keys) - len(pending)} Reviews bereits klassifiziert oder leer, {len(pending)} neu oder geändert.")
 
     # Reviews analysieren
-    classified_reviews = google_maps_comments["review"].apply(lambda review_text: pd.Series(analyzer.classify_reviews(str(review_text))))
+    if USE_ASYNC:
+        if USE_PACKING:
+            classify = lambda texts: asyncio.run(analyzer.classify_reviews_packed_async(texts))
+            prompt_template = (build_compact_packed_prompt if COMPACT_OUTPUT else build_packed_prompt)([("{id}", "{review}")])
+        else:
+            classify = lambda texts: asyncio.run(analyzer.classify_reviews_async(texts))
+            prompt_template = analyzer.build_request_prompt("{review}")
+    else:
+        classify = lambda texts: [analyzer.classify_reviews(text) for text in texts]
+        prompt_template = analyzer.build_request_prompt("{review}")
+
+    # Gleiche Reviews nur einmal klassifizieren, bekannte Ergebnisse aus dem Cache lesen
+    cache = ClassificationCache(CACHE_FILE, prompt_template, MODEL_NAME)
+    try:
+        for offset in range(0, len(pending), CHECKPOINT_INTERVAL):
+            positions = pending[offset:offset + CHECKPOINT_INTERVAL]
+            results = classify_with_cache([review_texts[position] for position in positions], cache, classify, fallback=DEFAULT_RESULT)
+            # Ergebnisse sofort sichern, damit ein Neustart hier weitermacht; Fallbacks (Fehler) werden
+            # wie im Cache nicht gespeichert, damit sie beim nächsten Lauf erneut klassifiziert werden
+            records = [(keys[position], hashes[position], result) for position, result in zip(positions, results) if result is not DEFAULT_RESULT]
+            checkpoint.append(records)
+            known.update((key, (hash_value, result)) for key, hash_value, result in records)
+            failed = [keys[position] for position, result in zip(positions, results) if result is DEFAULT_RESULT]
+            for key in failed:
+                known.pop(key, None)
+            if failed:
+                logger.warning(f"{len(failed)} Reviews ohne Ergebnis, sie werden beim nächsten Lauf erneut versucht.")
+            logger.info(f"{min(offset + CHECKPOINT_INTERVAL, len(pending))}/{len(pending)} Reviews klassifiziert.")
+    finally:
+        cache.close()
+    classified_reviews = pd.DataFrame(
+        [DEFAULT_RESULT if is_empty or key not in known else known[key][1] for key, is_empty in zip(keys, empty)],
+        index=google_maps_comments.index
+    )
 
     # Rating-Spalten einfügen
-    google_maps_comments.insert(3, "food_rating", classified_reviews["food"])
-    google_maps_comments.insert(4, "service_rating", classified_reviews["service"])
-    google_maps_comments.insert(5, "atmosphere_rating", classified_reviews["atmosphere"])
+    insert_rating_columns(google_maps_comments, classified_reviews)
 
-    # Ergebnis speichern
-    with open(INPUT_FILE, "w", encoding="utf-8", newline="") as f:
-        google_maps_comments.to_csv(f, index=False)
+    # Ergebnis erst vollständig in eine temporäre Datei schreiben, dann ersetzen
+    # Die Endung bleibt erhalten, damit .parquet-Ausgaben spaltenweise geschrieben werden
+    root, extension = os.path.splitext(OUTPUT_FILE)
+    temp_file = f"{root}.tmp{extension}"
+    with ChunkWriter(temp_file, encoding="utf-8") as writer:
+        writer.write(google_maps_comments)
+    os.replace(temp_file, OUTPUT_FILE)
+    # Der Lauf ist abgeschlossen, die Ausgabedatei dient ab jetzt als Grundlage
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
 
-    logger.info("Klassifizierung abgeschlossen.")
+    analyzer.metrics.record_reviews(len(pending))
+    analyzer.metrics.export(METRICS_JSON, METRICS_PROMETHEUS)
+    logger.info(f"Klassifizierung abgeschlossen, Ergebnis in {OUTPUT_FILE}.")
 
 if __name__ == "__main__":
     main()
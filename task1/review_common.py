@@ -0,0 +1,33 @@
+import pandas as pd
+
+RATING_COLUMNS = {"food": "food_rating", "service": "service_rating", "atmosphere": "atmosphere_rating"}
+# Position der Rating-Spalten in der Ausgabedatei
+RATING_COLUMN_POSITION = 3
+DEFAULT_RESULT = {"food": "None", "service": "None", "atmosphere": "None"}
+
+
+def build_prompt(text: str) -> str:
+    return (
+        "Analysiere den Ton des folgenden Kommentars zu Essen, Service und Atmosphäre. "
+        "Gib für jede Kategorie an: positiv, neutral, negativ oder None (wenn nicht erwähnt).\n\n"
+        f"Kommentar: \"{text}\"\n\n"
+        "Antwortformat (JSON), kein Markdown-Syntax:\n"
+        "{\n"
+        "  \"food\": \"...\",\n"
+        "  \"service\": \"...\",\n"
+        "  \"atmosphere\": \"...\"\n"
+        "}"
+    )
+
+
+def empty_reviews(reviews: pd.Series) -> pd.Series:
+    # Fehlende und leere Reviews werden nicht klassifiziert und erhalten "None"
+    return reviews.isna() | reviews.astype(str).str.strip().str.lower().isin(["", "nan", "none"])
+
+
+def insert_rating_columns(df: pd.DataFrame, ratings: pd.DataFrame) -> pd.DataFrame:
+    # ratings ist wie df indiziert; Zeilen ohne Ergebnis erhalten "None"
+    for offset, (key, column) in enumerate(RATING_COLUMNS.items()):
+        values = ratings[key].astype(object).where(ratings[key].notna(), "None")
+        df.insert(RATING_COLUMN_POSITION + offset, column, values)
+    return df
@@ -0,0 +1,87 @@
+import json
+import logging
+from typing import Dict, List, Tuple
+from tokens import estimate_tokens
+
+# Geschätzte Ausgabe-Tokens pro Review im JSON-Array, inkl. id
+OUTPUT_TOKENS_PER_REVIEW = 30
+OUTPUT_TOKENS_OVERHEAD = 10
+MAX_PACK_SIZE = 40
+RESULT_KEYS = ("food", "service", "atmosphere")
+
+logger = logging.getLogger(__name__)
+
+
+def build_packed_prompt(reviews: List[Tuple[str, str]]) -> str:
+    numbered_reviews = "\n".join(f"[{review_id}] \"{text}\"" for review_id, text in reviews)
+    return (
+        "Analysiere den Ton der folgenden Kommentare zu Essen, Service und Atmosphäre. "
+        "Gib für jeden Kommentar und jede Kategorie an: positiv, neutral, negativ oder None (wenn nicht erwähnt).\n\n"
+        f"Kommentare (mit id in eckigen Klammern):\n{numbered_reviews}\n\n"
+        "Antwortformat (JSON-Array mit genau einem Objekt pro Kommentar), kein Markdown-Syntax:\n"
+        "[\n"
+        "  {\"id\": \"...\", \"food\": \"...\", \"service\": \"...\", \"atmosphere\": \"...\"}\n"
+        "]"
+    )
+
+
+def packed_output_tokens(pack_size: int, tokens_per_review: int = OUTPUT_TOKENS_PER_REVIEW) -> int:
+    return OUTPUT_TOKENS_OVERHEAD + pack_size * tokens_per_review
+
+
+def pack_reviews(
+    reviews: List[Tuple[str, str]],
+    max_prompt_tokens: int,
+    max_completion_tokens: int,
+    model: str = "gpt-4",
+    max_pack_size: int = MAX_PACK_SIZE,
+    tokens_per_review: int = OUTPUT_TOKENS_PER_REVIEW
+) -> List[List[Tuple[str, str]]]:
+    # K ergibt sich aus dem Budget: Prompt- und Ausgabe-Tokens dürfen nicht überlaufen
+    size_limit = min(max_pack_size, (max_completion_tokens - OUTPUT_TOKENS_OVERHEAD) // tokens_per_review)
+    if size_limit < 1:
+        raise ValueError("max_completion_tokens is too small for a single review.")
+
+    base_tokens = estimate_tokens(build_packed_prompt([]), model)
+    packs = []
+    current: List[Tuple[str, str]] = []
+    current_tokens = base_tokens
+    for review_id, text in reviews:
+        review_tokens = estimate_tokens(f"[{review_id}] \"{text}\"\n", model)
+        if current and (len(current) >= size_limit or current_tokens + review_tokens > max_prompt_tokens):
+            packs.append(current)
+            current = []
+            current_tokens = base_tokens
+        current.append((review_id, text))
+        current_tokens += review_tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def parse_packed_response(content: str, expected_ids: List[str]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    content = content.strip()
+    # Manche Modelle antworten trotz Anweisung mit Markdown-Codeblock
+    if content.startswith("```"):
+        content = content.strip("`")
+        content = content[content.find("["):]
+
+    results: Dict[str, Dict[str, str]] = {}
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Gepackte Antwort konnte nicht geparst werden: {e}")
+        items = []
+    if not isinstance(items, list):
+        items = []
+
+    expected = set(expected_ids)
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        review_id = str(item.get("id", "")).strip("[] ")
+        if review_id in expected and all(key in item for key in RESULT_KEYS):
+            results[review_id] = {key: item[key] for key in RESULT_KEYS}
+
+    missing_ids = [review_id for review_id in expected_ids if review_id not in results]
+    return results, missing_ids
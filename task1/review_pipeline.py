@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import logging
+import argparse
+import threading
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from classification_cache import CACHE_FILE, ClassificationCache, classify_with_cache, deduplicate_reviews
+from review_common import DEFAULT_RESULT, RATING_COLUMNS, empty_reviews, insert_rating_columns
+from streaming_io import READ_CHUNK_SIZE, ChunkWriter
+
+INPUT_FILE = "task_1_google_maps_comments.csv"
+OUTPUT_FILE = "classified_reviews.csv"
+TIMINGS_FILE = "pipeline_timings.json"
+# Kleine Chunks, damit Lesen, Klassifizieren und Schreiben von Anfang an überlappen
+CHUNK_SIZE = 2_000
+# Höchstens so viele Chunks warten zwischen zwei Stufen; eine volle Queue bremst die vorgelagerte Stufe
+QUEUE_SIZE = 4
+WORKERS = os.cpu_count() or 1
+QUEUE_TIMEOUT_SECONDS = 0.2
+STAGES = ("read", "normalize", "classify", "write")
+# Höchstens so viele Batch-Chunks gleichzeitig in Bearbeitung
+MAX_BATCH_WORKERS = 4
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Markiert das Ende des Datenstroms zwischen zwei Stufen
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class Backend:
+    def __init__(
+        self,
+        classify: Callable[[List[str]], List[Dict[str, str]]],
+        close: Optional[Callable[[], None]] = None,
+        finish: Optional[Callable[[], None]] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self.classify = classify
+        # close läuft am Ende jedes Klassifizierungs-Threads, finish einmal nach dem ganzen Lauf
+        self.close = close
+        self.finish = finish
+        # Backends mit eigenem Rate-Limit oder eigener Parallelisierung laufen in einem einzigen Thread
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+
+class CachedClassify:
+    # SQLite-Verbindungen dürfen nicht zwischen Threads geteilt werden, daher eine pro Thread
+    def __init__(self, classify: Callable[[List[str]], List[Dict[str, str]]], prompt_template: str, model: str, cache_path: str = CACHE_FILE):
+        self.classify = classify
+        self.prompt_template = prompt_template
+        self.model = model
+        self.cache_path = cache_path
+        self.local = threading.local()
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, str]]:
+        cache = getattr(self.local, "cache", None)
+        if cache is None:
+            cache = self.local.cache = ClassificationCache(self.cache_path, self.prompt_template, self.model)
+        return classify_with_cache(texts, cache, self.classify, fallback=DEFAULT_RESULT)
+
+    def close(self) -> None:
+        cache = getattr(self.local, "cache", None)
+        if cache is not None:
+            cache.close()
+            self.local.cache = None
+
+
+def serial_backend(args: argparse.Namespace) -> Backend:
+    from review_classifier_seriell import METRICS_JSON, METRICS_PROMETHEUS, MODEL_NAME, ReviewClassifier
+    analyzer = ReviewClassifier(os.getenv("OPENAI_API_KEY"))
+    classify = CachedClassify(lambda texts: [analyzer.classify_reviews(text) for text in texts], analyzer.build_request_prompt("{review}"), MODEL_NAME)
+    return Backend(classify, classify.close, lambda: analyzer.metrics.export(METRICS_JSON, METRICS_PROMETHEUS), max_workers=1)
+
+
+def async_backend(args: argparse.Namespace) -> Backend:
+    from compact_output import build_compact_packed_prompt
+    from review_classifier_seriell import COMPACT_OUTPUT, METRICS_JSON, METRICS_PROMETHEUS, MODEL_NAME, USE_PACKING, ReviewClassifier
+    from review_packing import build_packed_prompt
+    analyzer = ReviewClassifier(os.getenv("OPENAI_API_KEY"))
+    if USE_PACKING:
+        prompt_template = (build_compact_packed_prompt if COMPACT_OUTPUT else build_packed_prompt)([("{id}", "{review}")])
+        classify = CachedClassify(lambda texts: asyncio.run(analyzer.classify_reviews_packed_async(texts)), prompt_template, MODEL_NAME)
+    else:
+        classify = CachedClassify(lambda texts: asyncio.run(analyzer.classify_reviews_async(texts)), analyzer.build_request_prompt("{review}"), MODEL_NAME)
+    # Das Rate-Limit gilt pro Aufruf, mehrere Threads würden es vervielfachen
+    return Backend(classify, classify.close, lambda: analyzer.metrics.export(METRICS_JSON, METRICS_PROMETHEUS), max_workers=1)
+
+
+def batch_backend(args: argparse.Namespace) -> Backend:
+    from compact_output import build_compact_packed_prompt, build_compact_prompt
+    from review_classifier_chunk_batches import (
+        COMPACT_OUTPUT, MAX_ENQUEUED_TOKENS, METRICS_JSON, METRICS_PROMETHEUS, MODEL_NAME, PACKED_MODE,
+        BatchJsonBuilder, OpenAIBatchRunner, classify_texts, work_dir_for
+    )
+    from review_common import build_prompt
+    from review_packing import build_packed_prompt
+    runner = OpenAIBatchRunner(os.getenv("OPENAI_API_KEY"))
+    if PACKED_MODE:
+        prompt_template = (build_compact_packed_prompt if COMPACT_OUTPUT else build_packed_prompt)([("{id}", "{review}")])
+    else:
+        prompt_template = build_compact_prompt("{review}") if COMPACT_OUTPUT else build_prompt("{review}")
+    # Chunks werden parallel eingereicht; das Enqueued-Token-Limit gilt fürs ganze Konto und wird aufgeteilt
+    workers = max(1, min(args.workers, MAX_BATCH_WORKERS))
+    token_budget = MAX_ENQUEUED_TOKENS // workers
+
+    def classify_chunk(texts: List[str]) -> List[Dict[str, str]]:
+        # Eigener Builder und eigenes Verzeichnis pro Chunk, damit sich parallele Runden nicht überschreiben
+        return classify_texts(BatchJsonBuilder(), runner, texts, work_dir_for(texts), token_budget)
+
+    classify = CachedClassify(classify_chunk, prompt_template, MODEL_NAME)
+    # Batch-Jobs laufen Stunden: wenige grosse Chunks statt vieler kleiner
+    return Backend(
+        classify, classify.close, lambda: runner.metrics.export(METRICS_JSON, METRICS_PROMETHEUS), max_workers=workers, chunk_size=READ_CHUNK_SIZE
+    )
+
+
+def nltk_backend(args: argparse.Namespace) -> Backend:
+    from multiprocessing import Pool
+    from review_classifier_nltk import BATCH_SIZE, _init_worker, classify_batch
+    # Ein Prozess-Pool für den ganzen Lauf; spaCy wird pro Prozess nur einmal geladen
+    pool = Pool(processes=args.workers, initializer=_init_worker)
+
+    def classify(texts: List[str]) -> List[Dict[str, str]]:
+        batches = [texts[start:start + BATCH_SIZE] for start in range(0, len(texts), BATCH_SIZE)]
+        return [result for results in pool.imap(classify_batch, batches) for result in results]
+
+    def finish() -> None:
+        pool.close()
+        pool.join()
+
+    return Backend(classify, finish=finish, max_workers=1)
+
+
+def distilled_backend(args: argparse.Namespace) -> Backend:
+    from review_classifier_distilled import MODEL_FILE, DistilledClassifier
+    model = DistilledClassifier.load(args.model or MODEL_FILE)
+    # Die Vorhersage ist reine Sparse-Matrix-Arithmetik und kann von mehreren Threads genutzt werden
+    return Backend(lambda texts: model.predict(texts).astype(str).to_dict("records"))
+
+
+BACKENDS: Dict[str, Callable[[argparse.Namespace], Backend]] = {
+    "serial": serial_backend,
+    "async": async_backend,
+    "batch": batch_backend,
+    "nltk": nltk_backend,
+    "distilled": distilled_backend
+}
+
+
+class StageTimer:
+    def __init__(self, name: str):
+        self.name = name
+        self.busy = 0.0
+        # Warten auf Eingabe: die Stufe ist unterausgelastet; blockiert: die nachgelagerte Stufe staut zurück
+        self.waiting = 0.0
+        self.blocked = 0.0
+        self.chunks = 0
+        self.rows = 0
+        self.lock = threading.Lock()
+
+    def add(self, busy: float = 0.0, waiting: float = 0.0, blocked: float = 0.0, chunks: int = 0, rows: int = 0) -> None:
+        with self.lock:
+            self.busy += busy
+            self.waiting += waiting
+            self.blocked += blocked
+            self.chunks += chunks
+            self.rows += rows
+
+    def summary(self) -> dict:
+        return {
+            "stage": self.name,
+            "busy_seconds": round(self.busy, 3),
+            "waiting_seconds": round(self.waiting, 3),
+            "blocked_seconds": round(self.blocked, 3),
+            "chunks": self.chunks,
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / self.busy, 1) if self.busy else None
+        }
+
+
+class ReviewPipeline:
+    def __init__(self, backend: Backend, chunk_size: int = CHUNK_SIZE, workers: int = WORKERS, queue_size: int = QUEUE_SIZE):
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.workers = max(1, min(workers, backend.max_workers or workers))
+        self.queue_size = queue_size
+        self.timers = {stage: StageTimer(stage) for stage in STAGES}
+        self.failed = threading.Event()
+        self.errors: List[BaseException] = []
+        self.elapsed = 0.0
+
+    def _put(self, target: queue.Queue, item, timer: StageTimer) -> None:
+        start = time.perf_counter()
+        while not self.failed.is_set():
+            try:
+                target.put(item, timeout=QUEUE_TIMEOUT_SECONDS)
+                timer.add(blocked=time.perf_counter() - start)
+                return
+            except queue.Full:
+                continue
+        raise PipelineAborted()
+
+    def _get(self, source: queue.Queue, timer: StageTimer):
+        start = time.perf_counter()
+        while not self.failed.is_set():
+            try:
+                item = source.get(timeout=QUEUE_TIMEOUT_SECONDS)
+                timer.add(waiting=time.perf_counter() - start)
+                return item
+            except queue.Empty:
+                continue
+        raise PipelineAborted()
+
+    def _run_stage(self, name: str, stage: Callable, *args) -> None:
+        try:
+            stage(*args)
+        except PipelineAborted:
+            pass
+        except BaseException as error:
+            # Ein Fehler in einer Stufe beendet alle anderen, statt sie an vollen Queues hängen zu lassen
+            logger.exception(f"Stufe {name} fehlgeschlagen.")
+            self.errors.append(error)
+            self.failed.set()
+
+    def read(self, input_file: str, target: queue.Queue) -> None:
+        timer = self.timers["read"]
+        chunks = iter(pd.read_csv(input_file, chunksize=self.chunk_size))
+        sequence = 0
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            timer.add(busy=time.perf_counter() - start, chunks=1, rows=len(chunk))
+            self._put(target, (sequence, chunk), timer)
+            sequence += 1
+        self._put(target, _DONE, timer)
+
+    def normalize(self, source: queue.Queue, target: queue.Queue) -> None:
+        timer = self.timers["normalize"]
+        while True:
+            item = self._get(source, timer)
+            if item is _DONE:
+                # Jeder Klassifizierungs-Thread erhält sein eigenes Endsignal
+                for _ in range(self.workers):
+                    self._put(target, _DONE, timer)
+                return
+            sequence, chunk = item
+            start = time.perf_counter()
+            reviews = chunk["review"]
+            empty = empty_reviews(reviews)
+            texts = reviews[~empty].astype(str).str.strip().tolist()
+            # Gleiche Reviews im Chunk nur einmal klassifizieren
+            unique_texts, inverse = deduplicate_reviews(texts)
+            timer.add(busy=time.perf_counter() - start, chunks=1, rows=len(chunk))
+            self._put(target, (sequence, chunk, chunk.index[~empty.to_numpy()], unique_texts, inverse), timer)
+
+    def classify(self, source: queue.Queue, target: queue.Queue) -> None:
+        timer = self.timers["classify"]
+        try:
+            while True:
+                item = self._get(source, timer)
+                if item is _DONE:
+                    self._put(target, _DONE, timer)
+                    return
+                sequence, chunk, review_index, unique_texts, inverse = item
+                start = time.perf_counter()
+                results = self.backend.classify(unique_texts) if unique_texts else []
+                ratings = pd.DataFrame([results[position] for position in inverse], index=review_index, columns=list(RATING_COLUMNS))
+                timer.add(busy=time.perf_counter() - start, chunks=1, rows=len(unique_texts))
+                self._put(target, (sequence, chunk, ratings), timer)
+        finally:
+            if self.backend.close is not None:
+                self.backend.close()
+
+    def write(self, output_file: str, source: queue.Queue) -> None:
+        timer = self.timers["write"]
+        pending = {}
+        next_sequence = 0
+        finished_workers = 0
+        with ChunkWriter(output_file) as writer:
+            while finished_workers < self.workers:
+                item = self._get(source, timer)
+                if item is _DONE:
+                    finished_workers += 1
+                    continue
+                sequence, chunk, ratings = item
+                pending[sequence] = (chunk, ratings)
+                # Mehrere Worker liefern Chunks vertauscht ab, geschrieben wird in der Reihenfolge der Eingabe
+                while next_sequence in pending:
+                    chunk, ratings = pending.pop(next_sequence)
+                    start = time.perf_counter()
+                    writer.write(insert_rating_columns(chunk, ratings.reindex(chunk.index)))
+                    timer.add(busy=time.perf_counter() - start, chunks=1, rows=len(chunk))
+                    next_sequence += 1
+
+    def run(self, input_file: str, output_file: str) -> int:
+        read_queue, normalize_queue, classify_queue = (queue.Queue(maxsize=self.queue_size) for _ in range(3))
+        threads = [
+            threading.Thread(target=self._run_stage, args=("read", self.read, input_file, read_queue)),
+            threading.Thread(target=self._run_stage, args=("normalize", self.normalize, read_queue, normalize_queue)),
+            *(
+                threading.Thread(target=self._run_stage, args=("classify", self.classify, normalize_queue, classify_queue))
+                for _ in range(self.workers)
+            ),
+            threading.Thread(target=self._run_stage, args=("write", self.write, output_file, classify_queue))
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        if self.backend.finish is not None:
+            self.backend.finish()
+        if self.errors:
+            raise self.errors[0]
+        return self.timers["write"].rows
+
+    def report(self) -> List[dict]:
+        summaries = [self.timers[stage].summary() for stage in STAGES]
+        for summary in summaries:
+            logger.info(
+                f"{summary['stage']:<9} aktiv {summary['busy_seconds']:8.2f}s  wartend {summary['waiting_seconds']:8.2f}s  "
+                f"blockiert {summary['blocked_seconds']:8.2f}s  {summary['chunks']:>5} Chunks  {summary['rows']:>8} Zeilen"
+            )
+        return summaries
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Reviews in überlappenden Stufen lesen, klassifizieren und schreiben.")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="async")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Endung .parquet schreibt spaltenweise")
+    parser.add_argument("--chunk-size", type=int, help="Zeilen pro Chunk, Standard je nach Backend")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Klassifizierungs-Threads bzw. Prozesse (nltk)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--model", help="Modelldatei für das distilled-Backend")
+    parser.add_argument("--timings", default=TIMINGS_FILE)
+    args = parser.parse_args(argv)
+
+    backend = BACKENDS[args.backend](args)
+    pipeline = ReviewPipeline(backend, args.chunk_size or backend.chunk_size or CHUNK_SIZE, args.workers, args.queue_size)
+    rows = pipeline.run(args.input, args.output)
+    summaries = pipeline.report()
+    with open(args.timings, "w", encoding="utf-8") as file:
+        json.dump({"backend": args.backend, "workers": pipeline.workers, "seconds": round(pipeline.elapsed, 3), "stages": summaries}, file, indent=2)
+    print(f"{rows} Reviews in {pipeline.elapsed:.1f}s mit Backend {args.backend} klassifiziert, Ergebnis in {args.output}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import logging
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from compact_output import LABEL_DTYPE
+from review_common import RATING_COLUMNS, empty_reviews, insert_rating_columns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+READ_CHUNK_SIZE = 50_000
+# Die Rating-Spalten der Klassifikatoren werden in Parquet als Dictionary gespeichert; bekannte Labels
+# zuerst, weitere Schreibweisen (z.B. "positive" aus dem NLTK-Skript) werden aus den Daten ergänzt
+KNOWN_LABELS = list(LABEL_DTYPE.categories)
+
+logger = logging.getLogger(__name__)
+
+
+def dumps_line(entry: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(entry) + b"\n"
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def iter_reviews(csv_path: str, chunksize: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, str]]:
+    # Nur die Review-Spalte lesen; der Index zählt über alle Chunks hinweg weiter
+    for chunk in pd.read_csv(csv_path, usecols=["review"], chunksize=chunksize):
+        reviews = chunk["review"]
+        for index, review in reviews[~empty_reviews(reviews)].items():
+            yield str(index), str(review).strip()
+
+
+def is_parquet(path: str) -> bool:
+    return str(path).endswith(".parquet")
+
+
+def read_output(path: str, **read_csv_options) -> pd.DataFrame:
+    # Parquet wird gemappt statt geparst, Ratings kommen direkt als Kategorien zurück
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("Für Parquet-Dateien wird pyarrow benötigt (pip install pyarrow).")
+        return pq.read_table(path, memory_map=True).to_pandas()
+    return pd.read_csv(path, **read_csv_options)
+
+
+class ChunkWriter:
+    # Schreibt DataFrame-Chunks fortlaufend als CSV oder als Parquet-Row-Groups (je nach Dateiendung)
+    def __init__(self, path: str, **to_csv_options):
+        self.path = path
+        self.to_csv_options = to_csv_options
+        self.parquet = is_parquet(path)
+        if self.parquet and pa is None:
+            raise ImportError("Für Parquet-Ausgaben wird pyarrow benötigt (pip install pyarrow).")
+        self.writer: Optional["pq.ParquetWriter"] = None
+        self.rows = 0
+        self.unknown_labels: Dict[str, set] = {}
+
+    def columnar(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk = chunk.copy()
+        for column in chunk.columns:
+            if column in RATING_COLUMNS.values():
+                chunk[column] = self.label_column(column, chunk[column])
+            elif chunk[column].dtype == object:
+                chunk[column] = chunk[column].astype("string")
+        return chunk
+
+    def label_column(self, column: str, values: pd.Series) -> pd.Categorical:
+        values = values.astype(object).where(values.notna(), "None").astype(str)
+        unknown = sorted(set(values.unique()) - set(KNOWN_LABELS))
+        new_labels = [label for label in unknown if label not in self.unknown_labels.setdefault(column, set())]
+        if new_labels:
+            # Unbekannte Labels bleiben erhalten, statt beim Umwandeln in Kategorien verloren zu gehen
+            logger.warning(f"Unbekannte Labels in {column}: {', '.join(new_labels)}")
+            self.unknown_labels[column].update(new_labels)
+        return pd.Categorical(values, categories=KNOWN_LABELS + unknown)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if not self.parquet:
+            chunk.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False, **self.to_csv_options)
+            self.rows += len(chunk)
+            return
+        table = pa.Table.from_pandas(self.columnar(chunk), preserve_index=False)
+        if self.writer is None:
+            # Das Schema des ersten Chunks gilt für die ganze Datei
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_classified_csv(
+    csv_path: str,
+    output_path: str,
+    classify: Callable[[List[str]], List[Dict[str, str]]],
+    chunksize: int = READ_CHUNK_SIZE,
+    **to_csv_options
+) -> int:
+    # Lesen, Klassifizieren und Schreiben pro Chunk: der Speicherbedarf hängt nur von chunksize ab
+    with ChunkWriter(output_path, **to_csv_options) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            reviews = chunk["review"]
+            empty = empty_reviews(reviews)
+            texts = reviews[~empty].astype(str).str.strip().tolist()
+            results = classify(texts) if texts else []
+            ratings = pd.DataFrame(results, index=chunk.index[~empty.to_numpy()], columns=list(RATING_COLUMNS))
+            writer.write(insert_rating_columns(chunk, ratings.reindex(chunk.index)))
+            logger.info(f"{writer.rows} Zeilen nach {output_path} geschrieben.")
+    return writer.rows
@@ -0,0 +1,35 @@
+from keyword_matcher import KeywordMatcher, parse_suffixes
+
+KEYWORDS = {
+    "food": ["essen[s]", "*gericht[e,en,es,s]", "speise*", "menu", "menü[s]"],
+    "service": ["bedienung[en]", "kellner[in,innen,n,s]", "*personal[s]"],
+    "atmosphere": ["ambiente", "musik", "einrichtung[en]"]
+}
+
+
+def test_parse_suffixes():
+    assert parse_suffixes("kellner[in, innen]") == ("kellner", ["in", "innen"])
+    assert parse_suffixes("*gericht[e]") == ("*gericht", ["e"])
+    assert parse_suffixes("musik") == ("musik", [])
+
+
+def test_declared_endings_match():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.categories("Die Kellnerin war nett") == {"service"}
+    assert matcher.categories("Die Hauptgerichte waren kalt") == {"food"}
+    assert matcher.categories("Die Speisekarte ist klein") == {"food"}
+    assert matcher.categories("Das Servicepersonal war schnell") == {"service"}
+
+
+def test_undeclared_endings_do_not_match():
+    matcher = KeywordMatcher(KEYWORDS)
+    # "menu" hat keine Endungen, "musik" darf nicht auf "Musiker" passen
+    assert matcher.categories("Mehrere menus zur Auswahl") == set()
+    assert matcher.categories("Der Musiker spielte laut") == set()
+    assert matcher.categories("Ein personalisiertes Angebot") == set()
+
+
+def test_categories_by_sentence():
+    matcher = KeywordMatcher(KEYWORDS)
+    text = "Das Essen war gut. Die Musik war laut."
+    assert matcher.categories_by_sentence(text, [0, 19]) == {0: {"food"}, 1: {"atmosphere"}}
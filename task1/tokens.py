@@ -0,0 +1,34 @@
+import math
+from functools import lru_cache
+from typing import Dict, List
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Grobe Schätzung für deutschen Text, falls tiktoken nicht installiert ist
+CHARS_PER_TOKEN = 3.0
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str, model: str = "gpt-4") -> int:
+    if tiktoken is not None:
+        return len(_get_encoding(model).encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_chat_tokens(messages: List[Dict[str, str]], model: str = "gpt-4") -> int:
+    tokens = TOKENS_PER_REPLY
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE + estimate_tokens(message["content"], model)
+    return tokens
@@ -0,0 +1,99 @@
+import csv
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from zefix_crawl import CSV_HEADER as CRAWL_HEADER, ShardedCrawler, plan_shards
+from zefix_details import DetailScraper, read_companies
+from zefix_fixture_server import FIXTURE_FILE, FixtureConfig, ZefixFixtureServer, load_fixtures
+from zefix_http_scraper import ZefixScraper, write_rows
+
+
+def run_search(server: ZefixFixtureServer, output: Path, workers: int, rps: float) -> dict:
+    scraper = ZefixScraper(server.base_url, workers, rps)
+    scraper.select_kantone(["Basel-Stadt", "Basel-Landschaft"])
+    scraper.select_rechtsform("Aktiengesellschaft")
+    start = time.perf_counter()
+    try:
+        rows = write_rows(scraper.iter_rows(), str(output))
+    finally:
+        scraper.quit()
+    return {"stage": "search", "workers": workers, "rows": rows, "seconds": time.perf_counter() - start}
+
+
+def run_crawl(server: ZefixFixtureServer, output: Path, workers: int, rps: float, result_cap: int) -> dict:
+    crawler = ShardedCrawler(server.base_url, workers, rps, result_cap)
+    start = time.perf_counter()
+    try:
+        with open(output, "w", newline="", encoding="utf-8-sig") as file:
+            writer = csv.writer(file)
+            writer.writerow(CRAWL_HEADER)
+            rows = crawler.crawl(plan_shards(["BS", "BL"], ["Aktiengesellschaft"]), writer)
+    finally:
+        crawler.quit()
+    return {"stage": "crawl", "workers": workers, "rows": rows, "seconds": time.perf_counter() - start, **crawler.stats}
+
+
+def run_details(server: ZefixFixtureServer, companies: Path, output: Path, workers: int, rps: float) -> dict:
+    scraper = DetailScraper(server.base_url, workers, rps)
+    start = time.perf_counter()
+    try:
+        rows = scraper.enrich(read_companies(str(companies)), str(output))
+    finally:
+        scraper.quit()
+    return {"stage": "details", "workers": workers, "rows": rows, "seconds": time.perf_counter() - start, "failed": len(scraper.failed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Such- und Detail-Scraper gegen den lokalen Fixture-Server messen.")
+    parser.add_argument("--fixtures", default=FIXTURE_FILE)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--rps", type=float, default=0.0, help="Höflichkeitslimit, 0 = ohne Limit")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate-503", type=float, default=0.0)
+    parser.add_argument("--limit", type=int, default=1_000, help="Anzahl Firmen für die Detailmessung")
+    parser.add_argument("--result-cap", type=int, default=5_000, help="Obergrenze der Treffer pro Suche im Fixture-Server")
+    parser.add_argument("--output", default="benchmark_zefix.json")
+    args = parser.parse_args()
+
+    firms = load_fixtures(args.fixtures)
+    config = FixtureConfig(args.latency, args.latency / 4, args.error_rate_503, args.result_cap)
+    server = ZefixFixtureServer(firms, port=0, config=config).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for workers in args.workers:
+                companies = Path(work_dir) / f"companies_{workers}.csv"
+                # Die einfache Suche endet an der Obergrenze, der Crawler muss alle Firmen finden
+                measurement = run_search(server, companies, workers, args.rps)
+                measurement["complete"] = measurement["rows"] == len(firms)
+                results.append(measurement)
+                crawl = run_crawl(server, Path(work_dir) / f"crawl_{workers}.csv", workers, args.rps, args.result_cap)
+                crawl["complete"] = crawl["rows"] == len(firms)
+                results.append(crawl)
+
+                subset = Path(work_dir) / f"subset_{workers}.csv"
+                with open(companies, encoding="utf-8-sig") as source, open(subset, "w", encoding="utf-8-sig") as target:
+                    for line_number, line in enumerate(source):
+                        if line_number > args.limit:
+                            break
+                        target.write(line)
+                details = run_details(server, subset, Path(work_dir) / f"details_{workers}.csv", workers, args.rps)
+                details["complete"] = details["rows"] == min(args.limit, len(firms))
+                results.append(details)
+            for measurement in results:
+                print(
+                    f"{measurement['stage']:<8} {measurement['workers']:>3} Worker  {measurement['rows']:>6} Zeilen  "
+                    f"{measurement['seconds']:7.2f}s  {measurement['rows'] / measurement['seconds']:8.1f} Zeilen/s  "
+                    f"vollständig: {measurement['complete']}"
+                )
+    finally:
+        server.stop()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Ergebnisse gespeichert in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+ROW_GROUP_SIZE = 50_000
+# Spalten mit wenigen verschiedenen Werten werden als Dictionary (kategorisch) gespeichert
+CATEGORICAL_COLUMNS = ("kanton", "rechtsform", "sitz")
+
+
+def is_parquet(path: str) -> bool:
+    return str(path).endswith(".parquet")
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Für Parquet-Ausgaben wird pyarrow benötigt (pip install pyarrow).")
+
+
+class ParquetRowWriter:
+    # Gleiche Schnittstelle wie csv.writer (writerow/writerows), schreibt aber Row Groups
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        categorical_columns: Iterable[str] = CATEGORICAL_COLUMNS,
+        row_group_size: int = ROW_GROUP_SIZE
+    ):
+        require_pyarrow()
+        self.columns = list(columns)
+        self.categorical = [column for column in self.columns if column in set(categorical_columns)]
+        self.schema = pa.schema([
+            (column, pa.dictionary(pa.int32(), pa.string()) if column in self.categorical else pa.string())
+            for column in self.columns
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd", use_dictionary=True)
+        self.row_group_size = row_group_size
+        self.buffer: List[Sequence[str]] = []
+        self.rows = 0
+
+    def writerow(self, row: Sequence[str]) -> None:
+        self.buffer.append(row)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def writerows(self, rows: Iterable[Sequence[str]]) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        arrays = []
+        for position, column in enumerate(self.columns):
+            values = pa.array([row[position] for row in self.buffer], type=pa.string())
+            arrays.append(values.dictionary_encode() if column in self.categorical else values)
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self) -> "ParquetRowWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_parquet_rows(path: str, columns: Optional[List[str]] = None) -> List[Dict[str, str]]:
+    require_pyarrow()
+    # Memory-Mapping statt vollständigem Einlesen und Parsen wie bei CSV
+    return pq.read_table(path, columns=columns, memory_map=True).to_pylist()
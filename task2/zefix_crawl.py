@@ -0,0 +1,213 @@
+import csv
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, List, Optional, Set, Tuple
+from columnar_output import ParquetRowWriter, is_parquet
+from zefix_http_scraper import CANTONS, LEGAL_FORMS, PAGE_SIZE, REQUESTS_PER_SECOND, ZEFIX_API_URL, ZefixClient, company_row
+
+CSV_OUTPUT = "unternehmen_schweiz.csv"
+CSV_HEADER = ["company_name", "uid", "sitz", "kanton", "rechtsform"]
+
+# Die Suche liefert pro Anfrage nur eine begrenzte Anzahl Treffer
+RESULT_CAP = 5_000
+# Zeichen, mit denen ein zu grosser Shard weiter nach Namenspräfix aufgeteilt wird;
+# Firmennamen können auch mit Akzenten, Anführungszeichen oder Satzzeichen beginnen.
+# Was hier fehlt, fällt bei der Vollständigkeitsprüfung in crawl() auf.
+PREFIX_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789äöüéèàâêîôûëïçñß\"'«»(.&+-@/["
+MAX_PREFIX_LENGTH = 4
+SHARD_WORKERS = 8
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class Shard:
+    def __init__(self, canton: str, legal_form: str, prefix: str = "", parent: Optional["Shard"] = None):
+        self.canton = canton
+        self.legal_form = legal_form
+        self.prefix = prefix
+        self.parent = parent
+        # Nur für aufgeteilte Shards: Trefferzahl laut Suche, eindeutige UIDs der Teile und offene Teile
+        self.total: Optional[int] = None
+        self.found_uids: Set[str] = set()
+        self.open_children = 0
+
+    @property
+    def name_query(self) -> str:
+        # "*" am Ende entspricht in der Zefix-Suche einer Präfixsuche
+        return f"{self.prefix}*" if self.prefix else ""
+
+    def split(self) -> List["Shard"]:
+        return [Shard(self.canton, self.legal_form, self.prefix + character, self) for character in PREFIX_ALPHABET]
+
+    def __repr__(self) -> str:
+        return f"Shard({self.canton}, {self.legal_form}, '{self.prefix}')"
+
+
+def plan_shards(cantons: Iterable[str], legal_forms: Iterable[str]) -> List[Shard]:
+    return [Shard(CANTONS.get(canton, canton), legal_form) for canton in cantons for legal_form in legal_forms]
+
+
+class ShardedCrawler:
+    def __init__(
+        self,
+        base_url: str = ZEFIX_API_URL,
+        workers: int = SHARD_WORKERS,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        result_cap: int = RESULT_CAP
+    ):
+        self.client = ZefixClient(base_url, workers, requests_per_second)
+        self.workers = workers
+        self.result_cap = result_cap
+        self.stats = {"shards": 0, "splits": 0, "truncated": 0, "duplicates": 0, "missing": 0}
+        # crawl_shard läuft in den Worker-Threads
+        self.stats_lock = threading.Lock()
+
+    def over_cap(self, shard: Shard, legal_form_ids: List[int]) -> bool:
+        # Der letzte noch gelieferte Treffer verrät, ob es weitere jenseits der Obergrenze gibt
+        data = self.client.search(shard.canton, legal_form_ids, self.result_cap - 1, 1, shard.name_query)
+        return bool(data.get("hasMoreResults"))
+
+    def count_hits(self, shard: Shard, legal_form_ids: List[int]) -> int:
+        # Jenseits der Obergrenze sind die Seiten leer, hasMoreResults verrät aber weiterhin die Gesamtzahl:
+        # exponentiell, dann binär nach dem letzten Offset mit weiteren Treffern suchen
+        def has_more(offset: int) -> bool:
+            return bool(self.client.search(shard.canton, legal_form_ids, offset, 1, shard.name_query).get("hasMoreResults"))
+
+        low, step = self.result_cap - 1, self.result_cap
+        high = low + step
+        while has_more(high):
+            low, step = high, step * 2
+            high = low + step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if has_more(middle):
+                low = middle
+            else:
+                high = middle
+        return high + 1
+
+    def add_stat(self, key: str, value: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[key] += value
+
+    @property
+    def complete(self) -> bool:
+        # Nur ein vollständiger Lauf darf fehlende Firmen als gelöscht werten
+        return self.stats["truncated"] == 0 and self.stats["missing"] == 0
+
+    def crawl_shard(self, shard: Shard) -> Tuple[List[Shard], List[List[str]]]:
+        legal_form_ids = [LEGAL_FORMS[shard.legal_form]]
+        first_page = self.client.search_page(shard.canton, legal_form_ids, 0, PAGE_SIZE, shard.name_query)
+        if len(first_page) == PAGE_SIZE and self.over_cap(shard, legal_form_ids):
+            if len(shard.prefix) < MAX_PREFIX_LENGTH:
+                shard.total = self.count_hits(shard, legal_form_ids)
+                return shard.split(), []
+            self.add_stat("truncated")
+            logger.warning(f"{shard} überschreitet die Obergrenze auch mit maximalem Präfix, Treffer fehlen.")
+
+        items = list(first_page)
+        if len(first_page) == PAGE_SIZE:
+            # Innerhalb eines Shards sequenziell blättern, parallelisiert wird über die Shards
+            items.extend(self.client.iter_search(
+                shard.canton, legal_form_ids, PAGE_SIZE, shard.name_query, page_workers=1, start_offset=PAGE_SIZE
+            ))
+        rows = [company_row(item, shard.canton) + [shard.legal_form] for item in items]
+        return [], rows
+
+    def crawl(self, shards: List[Shard], writer) -> int:
+        seen: Set[str] = set()
+        written = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self.crawl_shard, shard): shard for shard in shards}
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    shard = pending.pop(future)
+                    children, rows = future.result()
+                    if children:
+                        # Zu grosse Shards werden ersetzt und ihre Teile erneut eingeplant
+                        self.add_stat("splits")
+                        shard.open_children = len(children)
+                        logger.info(f"{shard} über der Obergrenze ({shard.total} Treffer), aufgeteilt in {len(children)} Präfixe.")
+                        pending.update({executor.submit(self.crawl_shard, child): child for child in children})
+                        continue
+                    self.add_stat("shards")
+                    # Überlappende Präfixe und Mehrfachtreffer über die UID zusammenführen
+                    for row in rows:
+                        if row[1] in seen:
+                            self.add_stat("duplicates")
+                            continue
+                        seen.add(row[1])
+                        writer.writerow(row)
+                        written += 1
+                    self.finish_shard(shard, {row[1] for row in rows})
+        logger.info(
+            f"{written} Firmen aus {self.stats['shards']} Shards in {time.perf_counter() - start:.1f}s "
+            f"({self.stats['splits']} Aufteilungen, {self.stats['duplicates']} Duplikate, {self.stats['missing']} fehlend)."
+        )
+        return written
+
+    def finish_shard(self, shard: Shard, uids: Set[str]) -> None:
+        # Über die UID zählen: Teile mit überlappenden Treffern dürfen keine fehlenden Firmen verdecken
+        ancestor = shard.parent
+        while ancestor is not None:
+            ancestor.found_uids |= uids
+            ancestor = ancestor.parent
+        # Sind alle Teile eines aufgeteilten Shards fertig, müssen sie zusammen dessen Treffer ergeben
+        parent = shard.parent
+        while parent is not None:
+            parent.open_children -= 1
+            if parent.open_children > 0:
+                return
+            found = len(parent.found_uids)
+            if parent.total is not None and found < parent.total:
+                self.add_stat("missing", parent.total - found)
+                logger.warning(
+                    f"{parent}: Teile liefern {found} von {parent.total} eindeutigen Treffern; "
+                    f"Namen mit Anfangszeichen ausserhalb von PREFIX_ALPHABET fehlen."
+                )
+            # Die UIDs werden nur für diese Prüfung gebraucht; die Vorfahren haben sie bereits erhalten
+            parent.found_uids = set()
+            parent = parent.parent
+
+    def quit(self):
+        self.client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Zefix-Register über Kantone, Rechtsformen und Namenspräfixe verteilt abfragen.")
+    parser.add_argument("--cantons", nargs="+", default=list(CANTONS), help="Kantonsnamen oder Kürzel")
+    parser.add_argument("--legal-forms", nargs="+", default=list(LEGAL_FORMS))
+    parser.add_argument("--base-url", default=ZEFIX_API_URL)
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS)
+    parser.add_argument("--rps", type=float, default=REQUESTS_PER_SECOND, help="Maximale Anfragen pro Sekunde")
+    parser.add_argument("--result-cap", type=int, default=RESULT_CAP)
+    parser.add_argument("--output", default=CSV_OUTPUT)
+    args = parser.parse_args(argv)
+
+    shards = plan_shards(args.cantons, args.legal_forms)
+    logger.info(f"{len(shards)} Shards geplant ({len(args.cantons)} Kantone × {len(args.legal_forms)} Rechtsformen).")
+    crawler = ShardedCrawler(args.base_url, args.workers, args.rps, args.result_cap)
+    try:
+        if is_parquet(args.output):
+            with ParquetRowWriter(args.output, CSV_HEADER) as writer:
+                count = crawler.crawl(shards, writer)
+        else:
+            with open(args.output, mode="w", newline="", encoding="utf-8-sig") as file:
+                writer = csv.writer(file)
+                writer.writerow(CSV_HEADER)
+                count = crawler.crawl(shards, writer)
+        print(f"{count} Einträge gespeichert in {args.output}")
+        if not crawler.complete:
+            logger.warning(f"Crawl unvollständig: {crawler.stats['missing']} Treffer fehlen, {crawler.stats['truncated']} Shards abgeschnitten.")
+    finally:
+        crawler.quit()
+
+if __name__ == "__main__":
+    main()
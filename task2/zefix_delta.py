@@ -0,0 +1,258 @@
+import os
+import csv
+import json
+import logging
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from columnar_output import ParquetRowWriter, is_parquet, read_parquet_rows
+from zefix_crawl import RESULT_CAP, ShardedCrawler, plan_shards
+from zefix_details import DETAIL_PATH, compact_uid
+from zefix_http_scraper import (
+    CANTONS, CSV_HEADER, CSV_OUTPUT, LEGAL_FORMS, REQUESTS_PER_SECOND, WORKERS, ZEFIX_API_URL, ZefixClient, format_uid
+)
+
+CHANGE_LOG = "zefix_changes.csv"
+CHANGE_LOG_HEADER = ["run_date", "change", *CSV_HEADER, "changed_fields"]
+STATE_FILE = "zefix_delta_state.json"
+# SHAB-Publikationen eines Tages: Neueintragungen, Mutationen und Löschungen
+PUBLICATIONS_PATH = "/sogc/bydate/{date}.json"
+ACTIVE_STATUS = "ACTIVE"
+# Ohne bekannten letzten Lauf höchstens so viele Tage nachholen, sonst vollständig neu laden
+MAX_DELTA_DAYS = 30
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    def __init__(self, path: str = CSV_OUTPUT):
+        self.path = path
+        self.rows: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path) and is_parquet(path):
+            self.rows = {row["uid"]: row for row in read_parquet_rows(path, CSV_HEADER)}
+        elif os.path.exists(path):
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                self.rows = {row["uid"]: row for row in csv.DictReader(file)}
+        logger.info(f"{len(self.rows)} Firmen aus {path} geladen.")
+
+    def save(self) -> None:
+        # Erst vollständig schreiben, dann ersetzen: ein Abbruch hinterlässt nie einen halben Snapshot
+        temp_path = self.path + ".tmp"
+        rows = sorted(self.rows.values(), key=lambda row: row["company_name"].lower())
+        if is_parquet(self.path):
+            with ParquetRowWriter(temp_path, CSV_HEADER) as writer:
+                writer.writerows([row[column] for column in CSV_HEADER] for row in rows)
+        else:
+            with open(temp_path, mode="w", newline="", encoding="utf-8-sig") as file:
+                writer = csv.DictWriter(file, fieldnames=CSV_HEADER, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+        os.replace(temp_path, self.path)
+
+    def apply(self, upserts: Iterable[Dict[str, str]], removals: Iterable[str] = ()) -> List[Tuple[str, Dict[str, str], List[str]]]:
+        changes = []
+        for row in upserts:
+            previous = self.rows.get(row["uid"])
+            if previous is None:
+                changes.append(("added", row, []))
+            else:
+                changed_fields = [column for column in CSV_HEADER if previous.get(column, "") != row.get(column, "")]
+                if not changed_fields:
+                    continue
+                changes.append(("changed", row, changed_fields))
+            self.rows[row["uid"]] = row
+        for uid in removals:
+            if uid in self.rows:
+                changes.append(("removed", self.rows.pop(uid), []))
+        return changes
+
+
+class RowCollector:
+    # Nimmt die Zeilen des Crawlers wie ein csv.writer entgegen, ohne die Spalte rechtsform
+    def __init__(self):
+        self.rows: List[List[str]] = []
+
+    def writerow(self, row: List[str]) -> None:
+        self.rows.append(row[:len(CSV_HEADER)])
+
+
+def diff_full(store: SnapshotStore, rows: Iterable[List[str]], complete: bool = True) -> List[Tuple[str, Dict[str, str], List[str]]]:
+    # Vollständiger Lauf: alles, was nicht mehr gefunden wird, gilt als entfernt
+    seen: Set[str] = set()
+    upserts = []
+    for row in rows:
+        record = dict(zip(CSV_HEADER, row))
+        seen.add(record["uid"])
+        upserts.append(record)
+    removals = [uid for uid in store.rows if uid not in seen]
+    if removals and not complete:
+        # Hat eine Suche die Obergrenze erreicht, fehlen Firmen im Ergebnis, die es weiterhin gibt
+        logger.warning(f"Suche unvollständig, {len(removals)} nicht gefundene Firmen bleiben im Snapshot.")
+        removals = []
+    return store.apply(upserts, removals)
+
+
+def write_change_log(changes: List[Tuple[str, Dict[str, str], List[str]]], path: str, run_date: str) -> None:
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, mode="a", newline="", encoding="utf-8-sig" if write_header else "utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=CHANGE_LOG_HEADER, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        for change, row, changed_fields in changes:
+            writer.writerow({"run_date": run_date, "change": change, **row, "changed_fields": ";".join(changed_fields)})
+
+
+def load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_state(path: str, state: dict) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+    os.replace(temp_path, path)
+
+
+def detail_value(detail: dict, *keys: str) -> Optional[str]:
+    # Erstes vorhandene Feld; verschachtelte Objekte (z.B. {"id": 3}) liefern ihre ID
+    for key in keys:
+        value = detail.get(key)
+        if isinstance(value, dict):
+            value = value.get("id")
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+class DeltaScraper:
+    def __init__(
+        self,
+        kantone: List[str],
+        rechtsform: str,
+        base_url: str = ZEFIX_API_URL,
+        workers: int = WORKERS,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        result_cap: int = RESULT_CAP
+    ):
+        self.kantone = [CANTONS.get(kanton, kanton) for kanton in kantone]
+        self.rechtsform = rechtsform
+        self.base_url = base_url
+        self.workers = workers
+        self.requests_per_second = requests_per_second
+        self.result_cap = result_cap
+        self.client = ZefixClient(base_url, workers, requests_per_second)
+
+    def full_rows(self) -> Tuple[List[List[str]], bool]:
+        # Über Namenspräfixe verteilt, damit keine Suche an der Obergrenze abbricht
+        crawler = ShardedCrawler(self.base_url, self.workers, self.requests_per_second, self.result_cap)
+        collector = RowCollector()
+        try:
+            crawler.crawl(plan_shards(self.kantone, [self.rechtsform]), collector)
+        finally:
+            crawler.quit()
+        return collector.rows, crawler.complete
+
+    def published_uids(self, since: date, until: date) -> Set[str]:
+        # Nur Firmen mit einer SHAB-Publikation seit dem letzten Lauf müssen neu abgefragt werden
+        days = [since + timedelta(days=offset) for offset in range((until - since).days + 1)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            publications = executor.map(lambda day: self.client.get(PUBLICATIONS_PATH.format(date=day.isoformat())), days)
+            uids = set()
+            for day_publications in publications:
+                for publication in day_publications:
+                    company = publication.get("companyShort") or publication
+                    if company.get("uid"):
+                        uids.add(format_uid(str(company["uid"])))
+        logger.info(f"{len(uids)} Firmen mit Publikationen zwischen {since} und {until}.")
+        return uids
+
+    def fetch_detail(self, uid: str) -> dict:
+        return self.client.get(DETAIL_PATH.format(uid=compact_uid(uid)))
+
+    def delta_changes(self, store: SnapshotStore, since: date, until: date) -> List[Tuple[str, Dict[str, str], List[str]]]:
+        uids = sorted(self.published_uids(since, until))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            details = list(executor.map(self.fetch_detail, uids))
+
+        legal_form_id = str(LEGAL_FORMS[self.rechtsform])
+        upserts = []
+        removals = []
+        unresolved = 0
+        for uid, detail in zip(uids, details):
+            previous = store.rows.get(uid)
+            status = detail_value(detail, "status")
+            legal_form = detail_value(detail, "legalFormId", "legalForm")
+            kanton = detail_value(detail, "canton")
+            # Entfernt wird nur bei ausdrücklich inaktivem Status oder bestätigtem Wechsel von Kanton bzw. Rechtsform
+            if (
+                (status is not None and status != ACTIVE_STATUS)
+                or (legal_form is not None and legal_form != legal_form_id)
+                or (kanton is not None and kanton not in self.kantone)
+            ):
+                removals.append(uid)
+                continue
+            if legal_form is None or kanton is None:
+                # Fehlende Felder gelten als unbekannt: bestehende Zeilen bleiben unverändert, neue werden nicht aufgenommen
+                unresolved += 1
+                continue
+            upserts.append({
+                "company_name": detail_value(detail, "name") or (previous or {}).get("company_name", ""),
+                "uid": uid,
+                "sitz": detail_value(detail, "legalSeat") or (previous or {}).get("sitz", ""),
+                "kanton": kanton
+            })
+        if unresolved:
+            logger.warning(f"{unresolved} Firmen ohne Rechtsform oder Kanton in der Detailantwort, Snapshot-Zeilen bleiben unverändert.")
+        return store.apply(upserts, removals)
+
+    def quit(self):
+        self.client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Zefix-Snapshot inkrementell über die UID aktualisieren und Änderungen protokollieren.")
+    parser.add_argument("--mode", choices=["auto", "delta", "full"], default="auto")
+    parser.add_argument("--snapshot", default=CSV_OUTPUT)
+    parser.add_argument("--change-log", default=CHANGE_LOG)
+    parser.add_argument("--state", default=STATE_FILE)
+    parser.add_argument("--base-url", default=ZEFIX_API_URL)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rps", type=float, default=REQUESTS_PER_SECOND, help="Maximale Anfragen pro Sekunde")
+    parser.add_argument("--result-cap", type=int, default=RESULT_CAP, help="Maximale Anzahl Treffer pro Suche")
+    parser.add_argument("--until", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.snapshot)
+    state = load_state(args.state)
+    last_run = date.fromisoformat(state["last_run"]) if "last_run" in state else None
+    mode = args.mode
+    if mode == "auto":
+        # Ohne Snapshot oder nach langer Pause ist ein vollständiger Lauf günstiger
+        delta_possible = store.rows and last_run and (args.until - last_run).days <= MAX_DELTA_DAYS
+        mode = "delta" if delta_possible else "full"
+
+    scraper = DeltaScraper(["Basel-Stadt", "Basel-Landschaft"], "Aktiengesellschaft", args.base_url, args.workers, args.rps, args.result_cap)
+    try:
+        if mode == "delta":
+            if last_run is None:
+                parser.error("Für den Delta-Modus fehlt der Zeitpunkt des letzten Laufs in der Zustandsdatei.")
+            changes = scraper.delta_changes(store, last_run, args.until)
+        else:
+            changes = diff_full(store, *scraper.full_rows())
+    finally:
+        scraper.quit()
+
+    write_change_log(changes, args.change_log, args.until.isoformat())
+    store.save()
+    save_state(args.state, {"last_run": args.until.isoformat(), "mode": mode})
+    counts = {change: sum(1 for entry in changes if entry[0] == change) for change in ("added", "changed", "removed")}
+    print(f"{mode}: {counts['added']} neu, {counts['changed']} geändert, {counts['removed']} entfernt; {len(store.rows)} Firmen in {args.snapshot}")
+
+if __name__ == "__main__":
+    main()
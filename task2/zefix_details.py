@@ -0,0 +1,152 @@
+import os
+import csv
+import time
+import random
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set
+from zefix_http_scraper import CSV_HEADER, CSV_OUTPUT, REQUESTS_PER_SECOND, ZEFIX_API_URL, ZefixClient
+
+INPUT_FILE = CSV_OUTPUT
+OUTPUT_FILE = "unternehmen_bl_bs_ag_details.csv"
+# Detailansicht einer Firma in der Zefix-Webapp
+DETAIL_PATH = "/firm/uid/{uid}.json"
+ADDRESS_COLUMNS = ["adresszusatz", "strasse", "hausnummer", "postfach", "plz", "ort"]
+
+# Anzahl paralleler Anfragen und maximale Anzahl offener Aufträge pro Worker
+WORKERS = 8
+QUEUE_FACTOR = 2
+MAX_ATTEMPTS = 4
+BASE_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def compact_uid(uid: str) -> str:
+    return uid.replace("-", "").replace(".", "").strip()
+
+
+def parse_address(data) -> Dict[str, str]:
+    # Die Antwort enthält je nach Version ein Objekt oder eine Liste mit einem Objekt
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    address = data.get("address") or {}
+    return {
+        "adresszusatz": address.get("careOf") or address.get("addon") or "",
+        "strasse": address.get("street", ""),
+        "hausnummer": address.get("houseNumber", ""),
+        "postfach": address.get("poBox", ""),
+        "plz": str(address.get("swissZipCode") or address.get("zipCode") or ""),
+        "ort": address.get("town") or address.get("city") or ""
+    }
+
+
+def read_companies(csv_path: str) -> Iterator[Dict[str, str]]:
+    with open(csv_path, newline="", encoding="utf-8-sig") as file:
+        yield from csv.DictReader(file)
+
+
+def completed_uids(csv_path: str) -> Set[str]:
+    if not os.path.exists(csv_path):
+        return set()
+    return {row["uid"] for row in read_companies(csv_path)}
+
+
+class DetailScraper:
+    def __init__(
+        self,
+        base_url: str = ZEFIX_API_URL,
+        workers: int = WORKERS,
+        requests_per_second: float = REQUESTS_PER_SECOND
+    ):
+        self.client = ZefixClient(base_url, workers, requests_per_second)
+        self.workers = workers
+        self.failed: List[str] = []
+
+    def fetch_address(self, uid: str) -> Dict[str, str]:
+        # urllib3 wiederholt 429/5xx bereits; hier zusätzlich Verbindungs- und Parsing-Fehler abfangen
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return parse_address(self.client.get(DETAIL_PATH.format(uid=compact_uid(uid))))
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning(f"Details zu {uid} fehlgeschlagen ({e}), neuer Versuch in {delay:.1f}s.")
+                time.sleep(delay)
+
+    def enrich(self, companies: Iterator[Dict[str, str]], output_path: str) -> int:
+        done = completed_uids(output_path)
+        if done:
+            logger.info(f"{len(done)} Firmen bereits in {output_path}, diese werden übersprungen.")
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        written = 0
+        start = time.perf_counter()
+
+        with open(output_path, "a", newline="", encoding="utf-8-sig" if write_header else "utf-8") as file, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            writer = csv.DictWriter(file, fieldnames=CSV_HEADER + ADDRESS_COLUMNS)
+            if write_header:
+                writer.writeheader()
+            pending = {}
+
+            def collect(futures) -> None:
+                nonlocal written
+                for future in futures:
+                    company = pending.pop(future)
+                    try:
+                        address = future.result()
+                    except Exception as e:
+                        logger.error(f"Keine Details zu {company['uid']}: {e}")
+                        self.failed.append(company["uid"])
+                        continue
+                    # Jede Zeile sofort schreiben, damit ein Abbruch nichts verliert
+                    writer.writerow({**{column: company[column] for column in CSV_HEADER}, **address})
+                    file.flush()
+                    written += 1
+                    if written % 500 == 0:
+                        logger.info(f"{written} Firmen ergänzt ({written / (time.perf_counter() - start):.1f}/s).")
+
+            for company in companies:
+                if company["uid"] in done:
+                    continue
+                # Nur eine begrenzte Anzahl Aufträge gleichzeitig offen halten
+                if len(pending) >= self.workers * QUEUE_FACTOR:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending[executor.submit(self.fetch_address, company["uid"])] = company
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        if self.failed:
+            logger.warning(f"{len(self.failed)} Firmen ohne Details; ein erneuter Lauf versucht sie nochmals.")
+        return written
+
+    def quit(self):
+        self.client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Adressen zu den Firmen aus der Zefix-Suche ergänzen (fortsetzbar).")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--base-url", default=ZEFIX_API_URL, help="z.B. die URL von zefix_fixture_server.py")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rps", type=float, default=REQUESTS_PER_SECOND, help="Maximale Anfragen pro Sekunde")
+    args = parser.parse_args(argv)
+
+    scraper = DetailScraper(args.base_url, args.workers, args.rps)
+    try:
+        start = time.perf_counter()
+        written = scraper.enrich(read_companies(args.input), args.output)
+        print(f"{written} Firmen mit Adresse gespeichert in {args.output} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        scraper.quit()
+
+if __name__ == "__main__":
+    main()
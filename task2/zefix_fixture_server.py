@@ -0,0 +1,268 @@
+import re
+import csv
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date
+from typing import Dict, List, Optional
+
+HOST = "127.0.0.1"
+PORT = 8788
+API_PREFIX = "/ZefixREST/api/v1"
+# Mitgelieferter Stand der Suche (BS/BL, Aktiengesellschaften) als Fixture
+FIXTURE_FILE = "unternehmen_bl_bs_ag.csv.csv"
+FIXTURE_LEGAL_FORM_ID = 3
+# Wie die echte Suche liefert der Server nur die ersten Treffer einer Anfrage aus
+RESULT_CAP = 5_000
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class FixtureConfig:
+    def __init__(self, latency: float = 0.05, latency_jitter: float = 0.02, error_rate_503: float = 0.0, result_cap: int = RESULT_CAP):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate_503 = error_rate_503
+        self.result_cap = result_cap
+
+
+def load_fixtures(path: str) -> List[dict]:
+    # Aufgezeichnete Suchtreffer (JSON-Liste) oder ein CSV-Snapshot des Scrapers
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    firms = []
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        for index, row in enumerate(csv.DictReader(file)):
+            firms.append({
+                "name": row["company_name"],
+                "ehraid": 100_000 + index,
+                "uid": row["uid"].replace("-", "").replace(".", ""),
+                "uidFormatted": row["uid"],
+                "legalSeat": row["sitz"],
+                "legalFormId": FIXTURE_LEGAL_FORM_ID,
+                "status": "ACTIVE",
+                "canton": row["kanton"]
+            })
+    return firms
+
+
+def fixture_address(firm: dict) -> dict:
+    # Aufgezeichnete Adresse verwenden, sonst eine stabile Ersatzadresse aus der UID ableiten
+    if "address" in firm:
+        return firm["address"]
+    seed = int(hashlib.sha256(firm["uid"].encode()).hexdigest(), 16)
+    streets = ("Hauptstrasse", "Bahnhofstrasse", "Freie Strasse", "Steinenvorstadt", "Gartenstrasse", "Rheinweg")
+    return {
+        "careOf": "",
+        "street": streets[seed % len(streets)],
+        "houseNumber": str(seed % 120 + 1),
+        "poBox": "",
+        "swissZipCode": str(4000 + seed % 500),
+        "town": firm["legalSeat"]
+    }
+
+
+def name_matches(name: str, query: str) -> bool:
+    if not query:
+        return True
+    # "*" am Ende steht wie in der Webapp für eine Präfixsuche
+    if query.endswith("*"):
+        return name.lower().startswith(query[:-1].lower())
+    return query.lower() in name.lower()
+
+
+class FixtureState:
+    def __init__(self, firms: List[dict], config: FixtureConfig):
+        self.firms = firms
+        self.firms_by_uid = {firm["uid"]: firm for firm in firms}
+        # SHAB-Publikationen pro Tag (ISO-Datum), siehe simulate_changes
+        self.publications: Dict[str, List[dict]] = {}
+        self.config = config
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.latencies.clear()
+            self.status_counts.clear()
+
+    def record(self, status: int, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.status_counts[str(status)] = self.status_counts.get(str(status), 0) + 1
+
+    def search(self, payload: dict) -> dict:
+        cantons = set(payload.get("cantons") or [])
+        legal_forms = set(payload.get("legalForms") or [])
+        matches = [
+            {key: value for key, value in firm.items() if key != "canton"}
+            for firm in self.firms
+            if firm["status"] == "ACTIVE"
+            and (not cantons or firm["canton"] in cantons)
+            and (not legal_forms or firm["legalFormId"] in legal_forms)
+            and name_matches(firm["name"], payload.get("name", ""))
+        ]
+        offset = payload.get("offset", 0)
+        max_entries = payload.get("maxEntries", 30)
+        # Seiten jenseits der Obergrenze bleiben leer, hasMoreResults zeigt aber weitere Treffer an
+        page = matches[:self.config.result_cap][offset:offset + max_entries]
+        return {"list": page, "offset": offset, "maxEntries": max_entries, "hasMoreResults": offset + max_entries < len(matches)}
+
+
+    def simulate_changes(self, day: date, added: int, changed: int, removed: int, seed: int = 0) -> None:
+        # Neueintragungen, Umbenennungen/Sitzverlegungen und Löschungen mit passenden Publikationen erzeugen
+        rng = random.Random(seed)
+        with self.lock:
+            active = [firm for firm in self.firms if firm["status"] == "ACTIVE"]
+            sample = rng.sample(active, changed + removed)
+            published = []
+            for firm in sample[:changed]:
+                firm["name"] = f"{firm['name']} in Liquidation" if rng.random() < 0.5 else firm["name"].replace(" AG", " Holding AG")
+                firm["legalSeat"] = rng.choice(["Basel", "Liestal", "Allschwil", firm["legalSeat"]])
+                published.append(firm)
+            for firm in sample[changed:]:
+                firm["status"] = "DELETED"
+                published.append(firm)
+            for index in range(added):
+                digits = f"{rng.randrange(10 ** 9):09d}"
+                firm = {
+                    "name": f"Neugründung {day.isoformat()} {index} AG",
+                    "ehraid": 900_000 + len(self.firms),
+                    "uid": f"CHE{digits}",
+                    "uidFormatted": f"CHE-{digits[0:3]}.{digits[3:6]}.{digits[6:9]}",
+                    "legalSeat": rng.choice(["Basel", "Liestal", "Muttenz"]),
+                    "legalFormId": FIXTURE_LEGAL_FORM_ID,
+                    "status": "ACTIVE",
+                    "canton": rng.choice(["BS", "BL"])
+                }
+                self.firms.append(firm)
+                self.firms_by_uid[firm["uid"]] = firm
+                published.append(firm)
+            self.firms.sort(key=lambda firm: firm["name"].lower())
+            self.publications.setdefault(day.isoformat(), []).extend(
+                {"sogcDate": day.isoformat(), "companyShort": {"uid": firm["uid"], "name": firm["name"]}} for firm in published
+            )
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    state: FixtureState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self) -> Optional[int]:
+        config = self.state.config
+        time.sleep(max(0.0, random.gauss(config.latency, config.latency_jitter)))
+        if random.random() < config.error_rate_503:
+            self._send_json(503, {"error": "Service Unavailable"})
+            return 503
+        return None
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/fixture/stats":
+            with self.state.lock:
+                self._send_json(200, {"latencies": list(self.state.latencies), "status_counts": dict(self.state.status_counts)})
+            return
+        start = time.perf_counter()
+        status = self._simulate() or self._handle_get(path)
+        self.state.record(status, time.perf_counter() - start)
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if path == "/fixture/reset":
+            self.state.reset_stats()
+            self._send_json(200, {"ok": True})
+            return
+        start = time.perf_counter()
+        status = self._simulate() or self._handle_post(path, body)
+        self.state.record(status, time.perf_counter() - start)
+
+    def _handle_get(self, path: str) -> int:
+        match = re.fullmatch(rf"{API_PREFIX}/firm/uid/(CHE\d{{9}})\.json", path)
+        if match and match.group(1) in self.state.firms_by_uid:
+            firm = self.state.firms_by_uid[match.group(1)]
+            detail = {key: value for key, value in firm.items() if key != "address"}
+            self._send_json(200, {**detail, "address": fixture_address(firm)})
+            return 200
+        match = re.fullmatch(rf"{API_PREFIX}/sogc/bydate/(\d{{4}}-\d{{2}}-\d{{2}})\.json", path)
+        if match:
+            with self.state.lock:
+                self._send_json(200, list(self.state.publications.get(match.group(1), [])))
+            return 200
+        self._send_json(404, {"error": f"Unknown path {path}"})
+        return 404
+
+    def _handle_post(self, path: str, body: bytes) -> int:
+        if path == f"{API_PREFIX}/firm/search.json":
+            self._send_json(200, self.state.search(json.loads(body)))
+            return 200
+        self._send_json(404, {"error": f"Unknown path {path}"})
+        return 404
+
+
+class ZefixFixtureServer:
+    def __init__(self, firms: List[dict], host: str = HOST, port: int = PORT, config: Optional[FixtureConfig] = None):
+        self.state = FixtureState(firms, config or FixtureConfig())
+        handler = type("BoundFixtureHandler", (FixtureHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> "ZefixFixtureServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Zefix-Ersatz mit aufgezeichneten Suchtreffern und Firmendetails.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--fixtures", default=FIXTURE_FILE, help="JSON-Liste aufgezeichneter Treffer oder CSV-Snapshot")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate-503", type=float, default=0.0)
+    parser.add_argument("--result-cap", type=int, default=RESULT_CAP, help="Maximale Anzahl Treffer pro Suche")
+    parser.add_argument("--simulate-changes", type=int, nargs=3, metavar=("NEU", "GEÄNDERT", "GELÖSCHT"), help="Änderungen mit heutigen Publikationen erzeugen")
+    args = parser.parse_args()
+
+    config = FixtureConfig(args.latency, args.latency_jitter, args.error_rate_503, args.result_cap)
+    server = ZefixFixtureServer(load_fixtures(args.fixtures), args.host, args.port, config)
+    if args.simulate_changes:
+        server.state.simulate_changes(date.today(), *args.simulate_changes)
+    logger.info(f"Fixture-Server läuft auf {server.base_url}.")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
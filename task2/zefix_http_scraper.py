@@ -0,0 +1,248 @@
+import csv
+import time
+import logging
+import argparse
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from columnar_output import ParquetRowWriter, is_parquet
+
+CSV_OUTPUT = "unternehmen_bl_bs_ag.csv"
+CSV_HEADER = ["company_name", "uid", "sitz", "kanton"]
+
+# REST-Schnittstelle, die auch die Zefix-Webapp für die Suche verwendet
+ZEFIX_API_URL = "https://www.zefix.ch/ZefixREST/api/v1"
+SEARCH_PATH = "/firm/search.json"
+LANGUAGE = "de"
+
+PAGE_SIZE = 100
+# Anzahl gleichzeitig abgefragter Seiten
+WORKERS = 4
+# Höflichkeitslimit über alle Threads hinweg
+REQUESTS_PER_SECOND = 4.0
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 5
+
+CANTONS = {
+    "Aargau": "AG", "Appenzell Ausserrhoden": "AR", "Appenzell Innerrhoden": "AI", "Basel-Landschaft": "BL",
+    "Basel-Stadt": "BS", "Bern": "BE", "Freiburg": "FR", "Genf": "GE", "Glarus": "GL", "Graubünden": "GR",
+    "Jura": "JU", "Luzern": "LU", "Neuenburg": "NE", "Nidwalden": "NW", "Obwalden": "OW", "Schaffhausen": "SH",
+    "Schwyz": "SZ", "Solothurn": "SO", "St. Gallen": "SG", "Tessin": "TI", "Thurgau": "TG", "Uri": "UR",
+    "Waadt": "VD", "Wallis": "VS", "Zug": "ZG", "Zürich": "ZH",
+}
+# IDs der Rechtsformen im Zefix-Suchformular
+LEGAL_FORMS = {
+    "Einzelunternehmen": 1,
+    "Kollektivgesellschaft": 2,
+    "Aktiengesellschaft": 3,
+    "Gesellschaft mit beschränkter Haftung": 4,
+    "Genossenschaft": 5,
+    "Verein": 6,
+    "Stiftung": 7,
+    "Institut des öffentlichen Rechts": 8,
+    "Zweigniederlassung": 9,
+    "Kommanditgesellschaft": 10,
+    "Zweigniederlassung einer ausl. Gesellschaft": 11,
+    "Kommanditaktiengesellschaft": 12,
+}
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class PolitenessLimiter:
+    def __init__(self, requests_per_second: float = REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self) -> None:
+        # Jeder Thread reserviert den nächsten freien Zeitpunkt und wartet ausserhalb des Locks
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def format_uid(uid: str) -> str:
+    digits = "".join(character for character in uid if character.isdigit())
+    if len(digits) != 9:
+        return uid
+    return f"CHE-{digits[0:3]}.{digits[3:6]}.{digits[6:9]}"
+
+
+def build_search_payload(name: str, canton: str, legal_form_ids: List[int], offset: int, max_entries: int) -> dict:
+    # Entspricht der Anfrage der Webapp bei aktivierter Kantonsauswahl
+    return {
+        "name": name,
+        "languageKey": LANGUAGE,
+        "searchType": "exact",
+        "cantons": [canton],
+        "legalForms": legal_form_ids,
+        "offset": offset,
+        "maxEntries": max_entries
+    }
+
+
+class ZefixClient:
+    def __init__(
+        self,
+        base_url: str = ZEFIX_API_URL,
+        workers: int = WORKERS,
+        requests_per_second: float = REQUESTS_PER_SECOND
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.limiter = PolitenessLimiter(requests_per_second)
+        # Eine Session mit Connection-Pool: Keep-Alive statt neuer TCP/TLS-Verbindung pro Seite
+        self.session = requests.Session()
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=1.0,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1), max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Content-Type": "application/json"})
+
+    def post(self, path: str, payload: dict) -> dict:
+        self.limiter.wait()
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, path: str) -> dict:
+        self.limiter.wait()
+        response = self.session.get(f"{self.base_url}{path}", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, canton: str, legal_form_ids: List[int], offset: int, max_entries: int = PAGE_SIZE, name: str = "") -> dict:
+        return self.post(SEARCH_PATH, build_search_payload(name, canton, legal_form_ids, offset, max_entries))
+
+    def search_page(self, canton: str, legal_form_ids: List[int], offset: int, max_entries: int = PAGE_SIZE, name: str = "") -> List[dict]:
+        return self.search(canton, legal_form_ids, offset, max_entries, name).get("list", [])
+
+    def iter_search(
+        self,
+        canton: str,
+        legal_form_ids: List[int],
+        page_size: int = PAGE_SIZE,
+        name: str = "",
+        page_workers: Optional[int] = None,
+        start_offset: int = 0
+    ) -> Iterator[dict]:
+        # Seiten in Wellen von "workers" parallelen Anfragen holen, bis eine Seite nicht mehr voll ist
+        page_workers = page_workers or self.workers
+        offset = start_offset
+        with ThreadPoolExecutor(max_workers=page_workers) as executor:
+            while True:
+                offsets = [offset + page * page_size for page in range(page_workers)]
+                pages = executor.map(lambda page_offset: self.search_page(canton, legal_form_ids, page_offset, page_size, name), offsets)
+                for page in pages:
+                    yield from page
+                    if len(page) < page_size:
+                        return
+                offset = offsets[-1] + page_size
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def company_row(item: dict, canton: str) -> List[str]:
+    uid = item.get("uidFormatted") or format_uid(str(item.get("uid", "")))
+    return [item.get("name", ""), uid, item.get("legalSeat", ""), canton]
+
+
+class ZefixScraper:
+    # Gleiche Schritte wie die Selenium-Variante, aber direkt über die REST-Schnittstelle
+    def __init__(self, base_url: str = ZEFIX_API_URL, workers: int = WORKERS, requests_per_second: float = REQUESTS_PER_SECOND):
+        self.client = ZefixClient(base_url, workers, requests_per_second)
+        self.kantone: List[str] = []
+        self.legal_form_ids: List[int] = []
+        self.page_size = PAGE_SIZE
+
+    def open_website(self):
+        pass
+
+    def select_kantone(self, kantone: List[str]):
+        self.kantone = [CANTONS.get(kanton, kanton) for kanton in kantone]
+
+    def select_rechtsform(self, rechtsform: str):
+        self.legal_form_ids = [LEGAL_FORMS[rechtsform]]
+
+    def submit_search(self):
+        pass
+
+    def set_entries_per_page(self, entries: int = PAGE_SIZE):
+        self.page_size = entries
+
+    def iter_rows(self) -> Iterator[List[str]]:
+        # Die Kantone einzeln abfragen, damit der Kanton jeder Zeile bekannt ist
+        seen = set()
+        for kanton in self.kantone:
+            for item in self.client.iter_search(kanton, self.legal_form_ids, self.page_size):
+                row = company_row(item, kanton)
+                if row[1] in seen:
+                    continue
+                seen.add(row[1])
+                yield row
+
+    def extract_data_from_pages(self) -> List[List[str]]:
+        return list(self.iter_rows())
+
+    def quit(self):
+        self.client.close()
+
+
+def write_rows(rows: Iterator[List[str]], csv_path: str) -> int:
+    count = 0
+    # Endung .parquet: spaltenweise in Row Groups, Kanton als Dictionary
+    if is_parquet(csv_path):
+        with ParquetRowWriter(csv_path, CSV_HEADER) as writer:
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+    with open(csv_path, mode="w", newline="", encoding="utf-8-sig") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zefix-Suche direkt über die REST-Schnittstelle der Webapp.")
+    parser.add_argument("--base-url", default=ZEFIX_API_URL, help="z.B. die URL von zefix_fixture_server.py")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rps", type=float, default=REQUESTS_PER_SECOND, help="Maximale Anfragen pro Sekunde")
+    parser.add_argument("--output", default=CSV_OUTPUT)
+    args = parser.parse_args()
+
+    scraper = ZefixScraper(args.base_url, args.workers, args.rps)
+
+    try:
+        start = time.perf_counter()
+        scraper.select_kantone(["Basel-Stadt", "Basel-Landschaft"])
+        scraper.select_rechtsform("Aktiengesellschaft")
+        scraper.set_entries_per_page(PAGE_SIZE)
+
+        # Zeilen werden geschrieben, sobald ihre Seite eingetroffen ist
+        count = write_rows(scraper.iter_rows(), args.output)
+        print(f"{count} Einträge gespeichert in {args.output} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        scraper.quit()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import time
 import csv
 import logging
 from selenium import webdriver
@@ -8,6 +7,24 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 CSV_OUTPUT = "unternehmen_bl_bs_ag.csv"
+PAGE_TIMEOUT = 30
+
+# Ganze Tabelle mit einem einzigen WebDriver-Aufruf als JSON auslesen statt Zelle für Zelle
+EXTRACT_TABLE_SCRIPT = """
+const table = document.querySelector("table");
+if (!table) { return []; }
+return Array.from(table.querySelectorAll("tr"))
+    .slice(1)
+    .map(row => Array.from(row.querySelectorAll("td"), cell => cell.innerText))
+    .filter(cells => cells.length >= 6)
+    .map(cells => [cells[0], cells[2].split("\\n")[0].trim(), cells[4], cells[5]]);
+"""
+# Zustand von Tabelle und Paginator, um auf den Seitenwechsel zu warten
+PAGE_STATE_SCRIPT = """
+const label = document.querySelector(".mat-mdc-paginator-range-label");
+const firstRow = document.querySelector("table tr:nth-child(2)");
+return [label ? label.innerText : "", firstRow ? firstRow.innerText : "", document.querySelectorAll("table tr").length];
+"""
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -19,6 +36,7 @@ class ZefixScraper:
         options.add_argument("--headless")
         self.driver = webdriver.Firefox(options=options)
         self.wait = WebDriverWait(self.driver, 10)
+        self.page_wait = WebDriverWait(self.driver, PAGE_TIMEOUT)
    
     def open_website(self):
         self.driver.get("https://www.zefix.ch/de/search/entity/welcome")
@@ -45,7 +63,15 @@ class ZefixScraper:
     def submit_search(self):
         search_button = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']")))
         self.driver.execute_script("arguments[0].click();", search_button)
-        time.sleep(2)
+        # Warten, bis die Trefferliste gerendert ist, statt einer festen Pause
+        self.page_wait.until(lambda driver: self.page_state()[2] > 1)
+
+    def page_state(self):
+        return self.driver.execute_script(PAGE_STATE_SCRIPT)
+
+    def wait_for_page_change(self, previous_state):
+        # Paginator-Text oder erste Zeile ändern sich, sobald die neue Seite geladen ist
+        self.page_wait.until(lambda driver: self.page_state()[:2] != previous_state[:2])
 
     def set_entries_per_page(self):
         entries_dropdown = self.wait.until(EC.element_to_be_clickable((
@@ -54,32 +80,19 @@ class ZefixScraper:
         )))
         self.driver.execute_script("arguments[0].scrollIntoView(true);", entries_dropdown)
         entries_dropdown.click()
+        previous_state = self.page_state()
 
         option_100 = self.wait.until(EC.element_to_be_clickable((
             By.XPATH,
             "//mat-option//span[normalize-space()='100']"
         )))
         self.driver.execute_script("arguments[0].click();", option_100)
+        self.wait_for_page_change(previous_state)
         logger.info("Anzahl Einträge pro Seite auf 100 gesetzt.")
 
     def extract_rows(self):
-        results = []
-        table = self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-        rows = table.find_elements(By.TAG_NAME, "tr")
-
-        for row in rows[1:]:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            if len(cells) >= 6:
-                try:
-                    company_name = cells[0].text
-                    uid = cells[2].text.split("\n")[0].strip()
-                    sitz = cells[4].text
-                    kanton = cells[5].text
-                    results.append([company_name, uid, sitz, kanton])
-                except Exception as e:
-                    logger.warning("Fehler beim Parsen einer Zeile:", e)
-                    continue
-        return results
+        self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
+        return self.driver.execute_script(EXTRACT_TABLE_SCRIPT)
 
     def extract_data_from_pages(self):
         all_data = []
@@ -90,9 +103,11 @@ class ZefixScraper:
                 next_button = self.driver.find_element(By.CSS_SELECTOR, "button[aria-label='Nächste Seite']")
                 if next_button.get_attribute("aria-disabled") == "true":
                     break
+                previous_state = self.page_state()
                 next_button.click()
-                time.sleep(1)
-            except:
+                self.wait_for_page_change(previous_state)
+            except Exception as e:
+                logger.warning(f"Paginierung abgebrochen: {e}")
                 break
         return all_data
 